@@ -72,7 +72,9 @@ for story_name in connections.keys():
 
 for story_name in connections.keys():
     model = LandscapeRevised(connections[story_name])
-    model.connections[np.eye(model.unit_count, dtype='bool')] = 0
+    initial_connections = model.connections.copy()
+    initial_connections[np.eye(model.unit_count, dtype='bool')] = 0
+    model.connections = initial_connections
     
     # track connection strengths for each unit
     connection_strengths[story_name].append(np.sum(model.connections, axis=0))
@@ -0,0 +1,263 @@
+"""
+Benchmarks of the model encoding, retrieval and likelihood hot paths.
+
+Synthetic stories of several sizes exercise Semantic_CMR encoding,
+outcome_probabilities, force_recall replay and LandscapeRevised encoding;
+semantic_data_likelihood is timed over the six real stories of
+`data/psifr_sbs.csv`. Each benchmark reports its best and median wall time
+over several repeats and the peak memory traced while it runs once more
+under tracemalloc (allocations made inside numba-compiled code are not
+traced). Results are written as JSON, and `--compare` reports the time
+ratio of each benchmark against an earlier results file.
+
+Run from the repository root, e.g. `make bench` or
+
+    python benchmarks/bench_models.py --sizes 30 300 --output bench_results.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+import tracemalloc
+
+import numpy as np
+import numba
+from numba.typed import Dict
+from numba.core import types
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root)
+
+from narrative_cmr.models import Semantic_CMR, Compiled_Semantic_CMR, LandscapeRevised
+from narrative_cmr.evaluation import story_likelihood, semantic_data_likelihood
+from narrative_cmr.datasets import open_trial_store, open_similarity_store
+
+parameters = {
+    'encoding_drift_rate': .5, 'start_drift_rate': .3, 'recall_drift_rate': .6,
+    'shared_support': .05, 'item_support': .3, 'learning_rate': .4,
+    'primacy_scale': 2., 'primacy_decay': .5, 'stop_probability_scale': .01,
+    'stop_probability_growth': .2, 'choice_sensitivity': 2., 'semantic_scale': .5}
+
+default_sizes = [30, 100, 300, 1000, 2000]
+
+# Synthetic stories
+
+def synthetic_story(size, seed=0, trial_count=10, units_per_cycle=4):
+    """
+    Random symmetric similarities in [0, 1], reading cycles of consecutive
+    units, and trials recalling random orderings of up to 50 units.
+    """
+
+    rng = np.random.default_rng(seed)
+    similarities = rng.random((size, size))
+    similarities = (similarities + similarities.T) / 2
+    np.fill_diagonal(similarities, 1)
+
+    cycles = [list(range(start, min(start + units_per_cycle, size)))
+              for start in range(0, size, units_per_cycle)]
+
+    width = min(size - 1, 50)
+    trials = np.zeros((trial_count, width), dtype=np.int64)
+    for trial in trials:
+        length = rng.integers(1, width + 1)
+        trial[:length] = rng.choice(size, length, replace=False) + 1
+    return similarities, cycles, trials
+
+def encoded_semantic_cmr(similarities):
+    model = Semantic_CMR(len(similarities), similarities, parameters)
+    model.experience(model.items)
+    return model
+
+# Benchmarks; each maps a story to a (setup, run) pair, run taking setup's result
+
+def semantic_experience(story):
+    similarities, _, _ = story
+
+    def setup():
+        return Semantic_CMR(len(similarities), similarities, parameters)
+
+    def run(model):
+        model.experience(model.items)
+    return setup, run
+
+def semantic_outcome_probabilities(story, calls=100):
+    similarities, _, _ = story
+
+    def setup():
+        model = encoded_semantic_cmr(similarities)
+        model.force_recall()
+        model.outcome_probabilities()
+        return model
+
+    def run(model):
+        for _ in range(calls):
+            model.outcome_probabilities()
+    return setup, run
+
+def semantic_force_recall_replay(story):
+    similarities, _, trials = story
+
+    def setup():
+        return encoded_semantic_cmr(similarities)
+
+    def run(model):
+        story_likelihood(model, trials)
+    return setup, run
+
+def landscape_experience(story):
+    similarities, cycles, _ = story
+
+    def setup():
+        return LandscapeRevised(similarities)
+
+    def run(model):
+        model.experience(cycles)
+    return setup, run
+
+synthetic_benchmarks = {
+    'Semantic_CMR.experience': semantic_experience,
+    'Semantic_CMR.outcome_probabilities': semantic_outcome_probabilities,
+    'Semantic_CMR.force_recall replay': semantic_force_recall_replay,
+    'LandscapeRevised.experience': landscape_experience,
+}
+
+# Real data
+
+def real_data(time_test=1):
+    """
+    Trial arrays and connections of the six stories in `data/psifr_sbs.csv`.
+    Similarities are cosines, shifted by 1 to keep activations positive.
+    """
+
+    trial_store = open_trial_store(os.path.join(root, 'data', 'psifr_sbs.csv'))
+    similarity_store = open_similarity_store(os.path.join(root, 'data', 'similarities.json'))
+    data_to_fit = trial_store.data_to_fit(time_test)
+    connections = similarity_store.connections(trial_store.story_names)
+    for i in range(len(connections)):
+        connections[i] = np.asarray(connections[i]) + 1
+    return data_to_fit, connections
+
+def data_likelihood(model_class):
+    def benchmark(story):
+        data_to_fit, connections = story
+        model_parameters = parameters
+        if model_class is Compiled_Semantic_CMR:
+            model_parameters = Dict.empty(key_type=types.unicode_type, value_type=types.float64)
+            for name, value in parameters.items():
+                model_parameters[name] = value
+
+        def setup():
+            return None
+
+        def run(_):
+            semantic_data_likelihood(data_to_fit, connections, model_class, model_parameters)
+        return setup, run
+    return benchmark
+
+data_benchmarks = {
+    'semantic_data_likelihood': data_likelihood(Semantic_CMR),
+    'semantic_data_likelihood (compiled)': data_likelihood(Compiled_Semantic_CMR),
+}
+
+# Measurement
+
+def measure(benchmark, story, repeats):
+    setup, run = benchmark(story)
+
+    # one untimed run compiles numba code and warms caches
+    run(setup())
+
+    times = []
+    for _ in range(repeats):
+        state = setup()
+        start = time.perf_counter()
+        run(state)
+        times.append(time.perf_counter() - start)
+
+    state = setup()
+    tracemalloc.start()
+    run(state)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {'best_seconds': min(times), 'median_seconds': float(np.median(times)),
+            'peak_bytes': peak, 'repeats': repeats}
+
+def metadata():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=root, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {'commit': commit, 'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(), 'numpy': np.__version__, 'numba': numba.__version__,
+            'machine': platform.machine(), 'processor': platform.processor(),
+            'cpu_count': os.cpu_count()}
+
+def run_benchmarks(sizes, repeats, names=None):
+    results = []
+
+    def record(name, size, measurement):
+        results.append(dict(benchmark=name, size=size, **measurement))
+        print('%-40s %6s %12.6f %12.6f %12.3f' % (
+            name, size, measurement['best_seconds'], measurement['median_seconds'],
+            measurement['peak_bytes'] / 2 ** 20), flush=True)
+
+    print('%-40s %6s %12s %12s %12s' % ('benchmark', 'size', 'best (s)', 'median (s)', 'peak (MiB)'))
+    for size in sizes:
+        story = synthetic_story(size)
+        for name, benchmark in synthetic_benchmarks.items():
+            if names is None or name in names:
+                record(name, size, measure(benchmark, story, repeats))
+
+    selected = [name for name in data_benchmarks if names is None or name in names]
+    if selected:
+        story = real_data()
+        for name in selected:
+            record(name, 'data', measure(data_benchmarks[name], story, repeats))
+    return results
+
+def compare(results, baseline):
+    """
+    Prints the median time of each benchmark relative to a baseline run.
+    """
+
+    previous = {(entry['benchmark'], str(entry['size'])): entry for entry in baseline['results']}
+    print('\nrelative to %s (%s)' % (baseline['metadata'].get('commit'), baseline['metadata'].get('time')))
+    print('%-40s %6s %12s %12s' % ('benchmark', 'size', 'time ratio', 'peak ratio'))
+    for entry in results:
+        match = previous.get((entry['benchmark'], str(entry['size'])))
+        if match is None:
+            continue
+        print('%-40s %6s %12.3f %12.3f' % (
+            entry['benchmark'], entry['size'], entry['median_seconds'] / match['median_seconds'],
+            entry['peak_bytes'] / max(match['peak_bytes'], 1)))
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=default_sizes,
+                        help='synthetic story sizes, in units')
+    parser.add_argument('--repeats', type=int, default=3, help='timed runs per benchmark')
+    parser.add_argument('--benchmarks', nargs='+', choices=list(synthetic_benchmarks) + list(data_benchmarks),
+                        help='benchmarks to run (default: all)')
+    parser.add_argument('--output', help='write results to this JSON file')
+    parser.add_argument('--compare', help='JSON results of an earlier run to compare against')
+    arguments = parser.parse_args(arguments)
+
+    results = {'metadata': metadata(),
+               'results': run_benchmarks(arguments.sizes, arguments.repeats, arguments.benchmarks)}
+
+    if arguments.output:
+        with open(arguments.output, 'w') as f:
+            json.dump(results, f, indent=1)
+    if arguments.compare:
+        with open(arguments.compare) as f:
+            compare(results['results'], json.load(f))
+    return results
+
+if __name__ == '__main__':
+    main()
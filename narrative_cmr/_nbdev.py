@@ -2,14 +2,90 @@
 
 __all__ = ["index", "modules", "custom_doc_links", "git_url"]
 
-index = {"semantic_data_likelihood": "Data_Likelihood_Under_Model.ipynb",
+index = {"trial_likelihood": "Data_Likelihood_Under_Model.ipynb",
+         "story_likelihood": "Data_Likelihood_Under_Model.ipynb",
+         "compiled_story_likelihood": "Data_Likelihood_Under_Model.ipynb",
+         "ragged_story_likelihoods": "Data_Likelihood_Under_Model.ipynb",
+         "compiled_ragged_story_likelihoods": "Data_Likelihood_Under_Model.ipynb",
+         "bounded_story_likelihood": "Data_Likelihood_Under_Model.ipynb",
+         "compiled_bounded_story_likelihood": "Data_Likelihood_Under_Model.ipynb",
+         "EncodingCache": "Data_Likelihood_Under_Model.ipynb",
+         "LikelihoodProfile": "Data_Likelihood_Under_Model.ipynb",
+         "profiled_trial_likelihood": "Data_Likelihood_Under_Model.ipynb",
+         "encoded_model": "Data_Likelihood_Under_Model.ipynb",
+         "semantic_data_likelihood": "Data_Likelihood_Under_Model.ipynb",
+         "ragged_semantic_data_likelihood": "Data_Likelihood_Under_Model.ipynb",
+         "bounded_data_likelihood": "Data_Likelihood_Under_Model.ipynb",
+         "trie_story_likelihood": "Data_Likelihood_Under_Model.ipynb",
+         "compiled_trie_story_likelihood": "Data_Likelihood_Under_Model.ipynb",
+         "trie_semantic_data_likelihood": "Data_Likelihood_Under_Model.ipynb",
+         "profiled_semantic_data_likelihood": "Data_Likelihood_Under_Model.ipynb",
+         "trial_tasks": "Data_Likelihood_Under_Model.ipynb",
+         "parallel_likelihood_kernel": "Data_Likelihood_Under_Model.ipynb",
+         "parallel_semantic_data_likelihood": "Data_Likelihood_Under_Model.ipynb",
          "semantic_objective_function": "Data_Likelihood_Under_Model.ipynb",
+         "batched_semantic_objective_function": "Data_Likelihood_Under_Model.ipynb",
+         "LandscapeEncodingCache": "Data_Likelihood_Under_Model.ipynb",
+         "copy_state": "Data_Likelihood_Under_Model.ipynb",
+         "landscape_story_likelihoods": "Data_Likelihood_Under_Model.ipynb",
+         "landscape_executor": "Data_Likelihood_Under_Model.ipynb",
+         "landscape_data_likelihood": "Data_Likelihood_Under_Model.ipynb",
+         "LandscapeObjectiveFunction": "Data_Likelihood_Under_Model.ipynb",
+         "landscape_objective_function": "Data_Likelihood_Under_Model.ipynb",
+         "batched_landscape_objective_function": "Data_Likelihood_Under_Model.ipynb",
+         "RaggedTrials": "Datasets.ipynb",
+         "ragged_trials": "Datasets.ipynb",
+         "RecallTries": "Datasets.ipynb",
+         "recall_tries": "Datasets.ipynb",
+         "partial_store": "Datasets.ipynb",
+         "replace_store": "Datasets.ipynb",
+         "trial_store_columns": "Datasets.ipynb",
+         "build_trial_store": "Datasets.ipynb",
+         "TrialStore": "Datasets.ipynb",
+         "open_trial_store": "Datasets.ipynb",
+         "build_similarity_store": "Datasets.ipynb",
+         "SimilarityStore": "Datasets.ipynb",
+         "open_similarity_store": "Datasets.ipynb",
+         "story_names": "Ingestion.ipynb",
+         "psifr_columns": "Ingestion.ipynb",
+         "read_unit_cycles": "Ingestion.ipynb",
+         "recall_events": "Ingestion.ipynb",
+         "narrative_recall_sources": "Ingestion.ipynb",
+         "file_digest": "Ingestion.ipynb",
+         "ingest_recall_data": "Ingestion.ipynb",
+         "write_psifr_csv": "Ingestion.ipynb",
+         "TranscriptKey": "Ingestion.ipynb",
+         "parse_transcript_name": "Ingestion.ipynb",
+         "docx_text": "Ingestion.ipynb",
+         "extract_transcripts": "Ingestion.ipynb",
+         "parameter_tangents": "Likelihood_Gradients.ipynb",
+         "normalize_tangent": "Likelihood_Gradients.ipynb",
+         "drift_tangent": "Likelihood_Gradients.ipynb",
+         "encoding_tangents": "Likelihood_Gradients.ipynb",
+         "outcome_tangents": "Likelihood_Gradients.ipynb",
+         "trie_story_gradient": "Likelihood_Gradients.ipynb",
+         "semantic_likelihood_gradient": "Likelihood_Gradients.ipynb",
+         "finite_difference_gradient": "Likelihood_Gradients.ipynb",
+         "semantic_gradient_objective_function": "Likelihood_Gradients.ipynb",
          "LandscapeRevised": "Landscape_Model.ipynb",
+         "Batched_LandscapeRevised": "Landscape_Model.ipynb",
+         "packed_rank_one_update": "Landscape_Model.ipynb",
+         "packed_symmetric_matvec": "Landscape_Model.ipynb",
          "cmr_spec": "Semantic_CMR.ipynb",
-         "Semantic_CMR": "Semantic_CMR.ipynb"}
+         "one_hot_features": "Semantic_CMR.ipynb",
+         "Semantic_CMR": "Semantic_CMR.ipynb",
+         "Compiled_Semantic_CMR": "Semantic_CMR.ipynb",
+         "Batched_Semantic_CMR": "Semantic_CMR.ipynb",
+         "simulate_free_recall": "Semantic_CMR.ipynb",
+         "subject_rng": "Simulation.ipynb",
+         "simulate_subjects": "Simulation.ipynb"}
 
-modules = ["evaluation.py",
-           "models.py"]
+modules = ["datasets.py",
+           "evaluation.py",
+           "gradients.py",
+           "ingestion.py",
+           "models.py",
+           "simulation.py"]
 
 doc_url = "https://githubpsyche.github.io/narrative_cmr/"
 
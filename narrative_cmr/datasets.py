@@ -0,0 +1,444 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: notebooks/model_evaluation/Datasets.ipynb (unless otherwise specified).
+
+__all__ = ['RaggedTrials', 'ragged_trials', 'RecallTries', 'recall_tries', 'partial_store', 'replace_store',
+           'trial_store_columns', 'build_trial_store', 'TrialStore', 'open_trial_store', 'build_similarity_store',
+           'SimilarityStore', 'open_similarity_store']
+
+# Cell
+# hide
+
+import os
+import sys
+import csv
+import json
+import shutil
+import tempfile
+import numpy as np
+from collections import namedtuple
+from multiprocessing import shared_memory, resource_tracker
+from numba.typed import List
+
+RaggedTrials = namedtuple('RaggedTrials', ['recalls', 'trial_offsets', 'story_offsets'])
+RaggedTrials.__doc__ = """
+Recall trials of several stories packed CSR-style.
+
+Trial t's recalls (study positions counted from 1, no padding) are
+`recalls[trial_offsets[t]:trial_offsets[t+1]]`, and story i's trials are
+those from `story_offsets[i]` to `story_offsets[i+1]`. Every field is a flat
+array, so the whole dataset can be memory-mapped or handed to worker
+processes cheaply.
+"""
+
+def ragged_trials(data_to_fit):
+    """
+    Packs per-story zero-padded trial arrays into RaggedTrials.
+    """
+
+    recalls, lengths, trial_counts = [], [], []
+    for trials in data_to_fit:
+        trials = np.asarray(trials)
+        recalls.append(trials[trials > 0])
+        lengths.append(np.sum(trials > 0, axis=1))
+        trial_counts.append(len(trials))
+
+    trial_offsets = np.zeros(sum(trial_counts) + 1, dtype=np.int64)
+    np.cumsum(np.concatenate(lengths), out=trial_offsets[1:])
+    story_offsets = np.zeros(len(trial_counts) + 1, dtype=np.int64)
+    np.cumsum(trial_counts, out=story_offsets[1:])
+    return RaggedTrials(np.concatenate(recalls).astype(np.int32), trial_offsets, story_offsets)
+
+RecallTries = namedtuple('RecallTries', ['items', 'depths', 'visits', 'stops', 'story_offsets'])
+RecallTries.__doc__ = """
+Prefix tries of the recall sequences of several stories, flattened.
+
+Each node is a distinct recall prefix of one story's trials; node n is
+reached by recalling study position `items[n]` after its parent's prefix,
+is `depths[n]` recalls deep, is passed through by `visits[n]` trials and ends
+`stops[n]` of them. Story i's nodes run from `story_offsets[i]` to
+`story_offsets[i+1]` in depth-first preorder (children by item), starting
+with its root, the empty prefix (item 0).
+"""
+
+def recall_tries(data_to_fit):
+    """
+    Builds RecallTries from RaggedTrials or per-story zero-padded trial
+    arrays.
+    """
+
+    if not isinstance(data_to_fit, RaggedTrials):
+        data_to_fit = ragged_trials(data_to_fit)
+    recalls, trial_offsets, story_offsets = data_to_fit
+
+    items, depths, visits, stops = [], [], [], []
+    node_offsets = [0]
+    for story_index in range(len(story_offsets) - 1):
+
+        # nodes are [visits, stops, children by item]
+        root = [0, 0, {}]
+        for trial_index in range(story_offsets[story_index], story_offsets[story_index + 1]):
+            node = root
+            node[0] += 1
+            for item in recalls[trial_offsets[trial_index]:trial_offsets[trial_index + 1]]:
+                node = node[2].setdefault(int(item), [0, 0, {}])
+                node[0] += 1
+            node[1] += 1
+
+        pending = [(0, 0, root)]
+        while pending:
+            item, depth, node = pending.pop()
+            items.append(item)
+            depths.append(depth)
+            visits.append(node[0])
+            stops.append(node[1])
+            for child in sorted(node[2], reverse=True):
+                pending.append((child, depth + 1, node[2][child]))
+        node_offsets.append(len(items))
+
+    return RecallTries(np.array(items, dtype=np.int64), np.array(depths, dtype=np.int64),
+                       np.array(visits, dtype=np.int64), np.array(stops, dtype=np.int64),
+                       np.array(node_offsets, dtype=np.int64))
+
+def partial_store(store_path):
+    """
+    Creates an empty, uniquely named directory beside `store_path` for a
+    store to be written into before replace_store moves it into place.
+    """
+
+    store_path = os.path.abspath(store_path)
+    parent = os.path.dirname(store_path)
+    os.makedirs(parent, exist_ok=True)
+    return tempfile.mkdtemp(prefix=os.path.basename(store_path) + '.partial-', dir=parent)
+
+def replace_store(partial_path, store_path):
+    """
+    Moves a completely written store directory into place, so readers only
+    ever see a whole store. Open memory maps of a replaced store stay valid.
+    """
+
+    # a directory can only be renamed over an empty one, so a stale store
+    # is first renamed aside (onto an empty directory) and removed after
+    stale = None
+    if os.path.isdir(store_path):
+        stale = partial_store(store_path)
+        try:
+            os.replace(store_path, stale)
+        except FileNotFoundError:
+            pass
+    try:
+        os.replace(partial_path, store_path)
+    except OSError:
+        # a concurrent build moved its own whole store into place first
+        if not os.path.isdir(store_path):
+            raise
+        shutil.rmtree(partial_path)
+    if stale is not None:
+        shutil.rmtree(stale)
+
+trial_store_columns = (
+    'trial_subject', 'trial_list', 'trial_story', 'trial_time_test', 'recall_offsets', 'recalls',
+    'group_keys', 'group_offsets', 'cycle_offsets', 'unit_cycles')
+
+def build_trial_store(csv_path, store_path):
+    """
+    Converts a psifr-formatted recall CSV (such as `data/psifr_sbs.csv`) into
+    a directory of `.npy` columns that TrialStore memory-maps.
+
+    Each subject/list pair is one trial. Trials are ordered by time_test,
+    story, subject and list, so the trials of each (time_test, story) group
+    are contiguous; `group_keys` and `group_offsets` index those groups and
+    `recall_offsets` indexes each trial's run of `recalls` (study positions
+    counted from 1), CSR-style. `unit_cycles` holds each story's reading
+    cycle per unit, indexed by `cycle_offsets`. Story names are kept in
+    `stories.json`. The store is written aside and moved into place whole.
+    """
+
+    trials = {}
+    stories = {}
+    with open(csv_path, newline='') as f:
+        for row in csv.DictReader(f):
+            key = (int(row['subject']), int(row['list']))
+            story_index = int(row['story_index'])
+            trial = trials.setdefault(key, [story_index, int(row['time_test']), []])
+
+            if row['trial_type'] == 'study':
+                story = stories.setdefault(story_index, [row['story_name'], {}])
+                story[1][int(row['item_index'])] = int(row['cycle'])
+            else:
+                trial[2].append((int(row['position']), int(row['item_index']) + 1))
+
+    order = sorted(trials, key=lambda key: (trials[key][1], trials[key][0]) + key)
+    recalls = [[item for _, item in sorted(trials[key][2])] for key in order]
+    columns = {
+        'trial_subject': np.array([key[0] for key in order], dtype=np.int32),
+        'trial_list': np.array([key[1] for key in order], dtype=np.int32),
+        'trial_story': np.array([trials[key][0] for key in order], dtype=np.int32),
+        'trial_time_test': np.array([trials[key][1] for key in order], dtype=np.int32),
+        'recall_offsets': np.cumsum([0] + [len(trial) for trial in recalls], dtype=np.int64),
+        'recalls': np.array([item for trial in recalls for item in trial], dtype=np.int32),
+    }
+
+    # trials sharing a (time_test, story) pair are contiguous
+    group_keys = np.stack((columns['trial_time_test'], columns['trial_story']), axis=1)
+    starts = np.flatnonzero(np.any(np.diff(group_keys, axis=0) != 0, axis=1)) + 1
+    starts = np.concatenate(([0], starts)) if len(group_keys) else starts
+    columns['group_keys'] = group_keys[starts].reshape(-1, 2)
+    columns['group_offsets'] = np.append(starts, len(group_keys)).astype(np.int64)
+
+    story_indices = sorted(stories)
+    story_cycles = [[stories[i][1][unit] for unit in sorted(stories[i][1])] for i in story_indices]
+    columns['cycle_offsets'] = np.cumsum([0] + [len(cycles) for cycles in story_cycles], dtype=np.int64)
+    columns['unit_cycles'] = np.array([cycle for cycles in story_cycles for cycle in cycles], dtype=np.int32)
+
+    partial_path = partial_store(store_path)
+    for name in trial_store_columns:
+        np.save(os.path.join(partial_path, name + '.npy'), columns[name])
+    with open(os.path.join(partial_path, 'stories.json'), 'w') as f:
+        json.dump({'story_indices': story_indices,
+                   'story_names': [stories[i][0] for i in story_indices]}, f)
+    replace_store(partial_path, store_path)
+
+class TrialStore:
+    """
+    Read-only view of a store written by build_trial_store.
+
+    Columns are memory-mapped, so opening a store costs a few page faults
+    rather than a CSV parse and processes fitting the same data share its
+    pages. Trials are handed out as zero-padded arrays of study positions,
+    the layout scored by the likelihood functions.
+    """
+
+    def __init__(self, store_path, mmap_mode='r'):
+        self.store_path = store_path
+        for name in trial_store_columns:
+            setattr(self, name, np.load(os.path.join(store_path, name + '.npy'), mmap_mode=mmap_mode))
+        with open(os.path.join(store_path, 'stories.json')) as f:
+            stories = json.load(f)
+        self.story_indices = stories['story_indices']
+        self.story_names = stories['story_names']
+
+    def trial_indices(self, story_index, time_test, subject=None, include_empty=False):
+        """
+        Indices of the trials of a story at a time_test, optionally only
+        those of one subject. Trials without any recall are left out unless
+        `include_empty`, matching trial arrays pivoted from psifr events.
+        """
+
+        group = np.flatnonzero(np.all(self.group_keys == (time_test, story_index), axis=1))
+        if len(group) == 0:
+            return np.zeros(0, dtype=np.int64)
+
+        indices = np.arange(self.group_offsets[group[0]], self.group_offsets[group[0] + 1])
+        if subject is not None:
+            indices = indices[self.trial_subject[indices] == subject]
+        if not include_empty:
+            indices = indices[np.diff(self.recall_offsets)[indices] > 0]
+        return indices
+
+    def trials(self, story_index, time_test, subject=None, include_empty=False):
+        """
+        Zero-padded (trial, output position) array of a story's recalls at
+        a time_test.
+        """
+
+        indices = self.trial_indices(story_index, time_test, subject, include_empty)
+        starts = self.recall_offsets[indices]
+        lengths = self.recall_offsets[indices + 1] - starts
+        result = np.zeros((len(indices), max(lengths, default=0)), dtype=np.int64)
+
+        # scatter each trial's run of recalls into its row
+        rows = np.repeat(np.arange(len(indices)), lengths)
+        columns = np.arange(len(rows)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        result[rows, columns] = self.recalls[np.repeat(starts, lengths) + columns]
+        return result
+
+    def data_to_fit(self, time_test, subject=None, include_empty=False):
+        """
+        Typed list of each story's trial array, in story order, as taken by
+        semantic_data_likelihood and the other likelihood functions.
+        """
+
+        data = List()
+        for story_index in self.story_indices:
+            data.append(self.trials(story_index, time_test, subject, include_empty))
+        return data
+
+    def ragged_trials(self, time_test, subject=None, include_empty=False):
+        """
+        RaggedTrials of every story at a time_test, in story order, sliced
+        directly from the stored recall column.
+        """
+
+        indices = [self.trial_indices(story_index, time_test, subject, include_empty)
+                   for story_index in self.story_indices]
+        story_offsets = np.zeros(len(indices) + 1, dtype=np.int64)
+        np.cumsum([len(story) for story in indices], out=story_offsets[1:])
+
+        indices = np.concatenate(indices)
+        starts = self.recall_offsets[indices]
+        lengths = self.recall_offsets[indices + 1] - starts
+        trial_offsets = np.zeros(len(indices) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=trial_offsets[1:])
+
+        positions = np.repeat(starts - trial_offsets[:-1], lengths) + np.arange(trial_offsets[-1])
+        return RaggedTrials(np.asarray(self.recalls[positions]), trial_offsets, story_offsets)
+
+    def cycles(self, story_index):
+        """
+        Reading cycles of a story as lists of unit indices, as taken by
+        LandscapeRevised.experience.
+        """
+
+        position = self.story_indices.index(story_index)
+        unit_cycles = self.unit_cycles[self.cycle_offsets[position]:self.cycle_offsets[position + 1]]
+        return [np.flatnonzero(unit_cycles == cycle).tolist() for cycle in np.unique(unit_cycles)]
+
+def open_trial_store(csv_path, store_path=None, mmap_mode='r'):
+    """
+    Memory-maps the trial store for `csv_path`, converting the CSV first if
+    the store is missing or older than it. The store defaults to a
+    directory beside the CSV named after it with a `_store` suffix.
+    """
+
+    if store_path is None:
+        store_path = os.path.splitext(csv_path)[0] + '_store'
+
+    marker = os.path.join(store_path, 'stories.json')
+    if not os.path.exists(marker) or os.path.getmtime(marker) < os.path.getmtime(csv_path):
+        build_trial_store(csv_path, store_path)
+    return TrialStore(store_path, mmap_mode)
+
+# Cell
+
+def build_similarity_store(json_path, store_path):
+    """
+    Serializes the story similarity matrices of a JSON file (such as
+    `data/similarities.json`, mapping story names to square matrices) into
+    one flat float64 `matrices.npy` beside an index of story names and
+    sizes, for SimilarityStore to map. The store is written aside and moved
+    into place whole.
+    """
+
+    with open(json_path) as f:
+        similarities = json.load(f)
+
+    names = list(similarities)
+    matrices = [np.array(similarities[name], dtype=np.float64) for name in names]
+    partial_path = partial_store(store_path)
+    np.save(os.path.join(partial_path, 'matrices.npy'),
+            np.concatenate([matrix.ravel() for matrix in matrices]))
+    with open(os.path.join(partial_path, 'index.json'), 'w') as f:
+        json.dump({'story_names': names, 'sizes': [len(matrix) for matrix in matrices]}, f)
+    replace_store(partial_path, store_path)
+
+class SimilarityStore:
+    """
+    Story similarity matrices as views into one flat float64 buffer.
+
+    Opened from a store directory the buffer is memory-mapped, so processes
+    on a node share the page cache's copy. `share` instead copies it once
+    into a named `multiprocessing.shared_memory` block, which workers open
+    without touching disk through `SimilarityStore.attach`. Either way
+    `connections()` returns per-story views, not copies, in the form taken
+    by the likelihood functions and LandscapeRevised.
+    """
+
+    def __init__(self, buffer, story_names, sizes, shared_block=None):
+        self.buffer = buffer
+        self.story_names = list(story_names)
+        self.sizes = list(sizes)
+        self.shared_block = shared_block
+
+        offsets = np.cumsum([0] + [size * size for size in self.sizes])
+        self.matrices = [np.asarray(buffer[offsets[i]:offsets[i + 1]]).reshape(size, size)
+                         for i, size in enumerate(self.sizes)]
+
+    @classmethod
+    def load(cls, store_path, mmap_mode='r'):
+        with open(os.path.join(store_path, 'index.json')) as f:
+            index = json.load(f)
+        buffer = np.load(os.path.join(store_path, 'matrices.npy'), mmap_mode=mmap_mode)
+        return cls(buffer, index['story_names'], index['sizes'])
+
+    @classmethod
+    def attach(cls, descriptor):
+        """
+        Opens matrices shared by another process's `share`. The returned
+        store keeps the block open; call `close` when done with it. Only
+        the sharing process unlinks the block.
+        """
+
+        # before Python 3.13 attaching registers the block with this
+        # process's resource tracker, which unlinks it for every process
+        # when this one exits
+        if sys.version_info >= (3, 13):
+            block = shared_memory.SharedMemory(name=descriptor['name'], track=False)
+        else:
+            block = shared_memory.SharedMemory(name=descriptor['name'])
+            if os.name == 'posix':
+                resource_tracker.unregister(block._name, 'shared_memory')
+        buffer = np.ndarray((descriptor['length'],), dtype=np.float64, buffer=block.buf)
+        return cls(buffer, descriptor['story_names'], descriptor['sizes'], block)
+
+    def share(self):
+        """
+        Copies the matrices into a new shared memory block and returns the
+        (picklable) descriptor workers pass to `attach`, along with a store
+        viewing the block. The creating process should `close` and `unlink`
+        that store once workers are finished.
+        """
+
+        block = shared_memory.SharedMemory(create=True, size=max(self.buffer.nbytes, 1))
+        buffer = np.ndarray(self.buffer.shape, dtype=np.float64, buffer=block.buf)
+        buffer[:] = self.buffer
+        descriptor = {'name': block.name, 'length': len(buffer),
+                      'story_names': self.story_names, 'sizes': self.sizes}
+        return descriptor, SimilarityStore(buffer, self.story_names, self.sizes, block)
+
+    def close(self):
+        # views must be dropped before the block can be closed
+        self.matrices = []
+        self.buffer = None
+        if self.shared_block is not None:
+            self.shared_block.close()
+
+    def unlink(self):
+        if self.shared_block is not None:
+            # an attach in this process, or in a child sharing its resource
+            # tracker, may have unregistered the block, which unlink expects
+            # to find registered
+            if sys.version_info < (3, 13) and os.name == 'posix':
+                resource_tracker.register(self.shared_block._name, 'shared_memory')
+            self.shared_block.unlink()
+
+    def __getitem__(self, story):
+        if isinstance(story, str):
+            story = self.story_names.index(story)
+        return self.matrices[story]
+
+    def __len__(self):
+        return len(self.matrices)
+
+    def connections(self, story_names=None):
+        """
+        Typed list of story matrices, in store order or the given order.
+        """
+
+        connections = List()
+        for story in (self.story_names if story_names is None else story_names):
+            connections.append(self[story])
+        return connections
+
+def open_similarity_store(json_path, store_path=None, mmap_mode='r'):
+    """
+    Memory-maps the similarity store for `json_path`, serializing the JSON
+    first if the store is missing or older than it. The store defaults to a
+    directory beside the JSON named after it with a `_store` suffix.
+    """
+
+    if store_path is None:
+        store_path = os.path.splitext(json_path)[0] + '_store'
+
+    marker = os.path.join(store_path, 'index.json')
+    if not os.path.exists(marker) or os.path.getmtime(marker) < os.path.getmtime(json_path):
+        build_similarity_store(json_path, store_path)
+    return SimilarityStore.load(store_path, mmap_mode)
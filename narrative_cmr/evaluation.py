@@ -1,60 +1,727 @@
 # AUTOGENERATED! DO NOT EDIT! File to edit: notebooks/model_evaluation/Data_Likelihood_Under_Model.ipynb (unless otherwise specified).
 
-__all__ = ['semantic_data_likelihood', 'semantic_objective_function']
+__all__ = ['trial_likelihood', 'story_likelihood', 'compiled_story_likelihood', 'ragged_story_likelihoods',
+           'compiled_ragged_story_likelihoods', 'bounded_story_likelihood', 'compiled_bounded_story_likelihood',
+           'EncodingCache', 'LikelihoodProfile', 'profiled_trial_likelihood', 'encoded_model',
+           'semantic_data_likelihood', 'ragged_semantic_data_likelihood', 'bounded_data_likelihood',
+           'trie_story_likelihood', 'compiled_trie_story_likelihood', 'trie_semantic_data_likelihood',
+           'profiled_semantic_data_likelihood', 'trial_tasks', 'parallel_likelihood_kernel',
+           'parallel_semantic_data_likelihood', 'semantic_objective_function', 'batched_semantic_objective_function',
+           'LandscapeEncodingCache', 'copy_state', 'landscape_story_likelihoods', 'landscape_executor',
+           'landscape_data_likelihood', 'LandscapeObjectiveFunction', 'landscape_objective_function',
+           'batched_landscape_objective_function']
 
 # Cell
 # hide
 
+import time
 import numpy as np
-from numba import njit, prange
-from numba.typed import Dict
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from numba import njit, prange, get_num_threads
+from numba.typed import Dict, List
 from numba.core import types
+from numba.experimental.jitclass.base import JitClassType
+from numba.extending import register_jitable
+from .datasets import RaggedTrials, ragged_trials, RecallTries, recall_tries
+from .models import LandscapeRevised, Batched_LandscapeRevised, Batched_Semantic_CMR
 
-#@njit(fastmath=True, nogil=True, parallel=True)
-def semantic_data_likelihood(data_to_fit, connections, model_class, parameters):
+@register_jitable
+def trial_likelihood(model, trial):
+    """
+    Log-likelihood of one recall trial under an encoded model.
+
+    The model is returned to its pre-retrieval (but post-encoding) state
+    afterward, so trials can be replayed one after another.
+    """
+
+    item_count = model.item_count
+    result = 0.0
+
+    model.force_recall()
+    for recall_index in range(len(trial) + 1):
+
+        # identify index of item recalled; if zero then recall is over
+        # a trial recalling every item has no stop event to score
+        if recall_index == len(trial):
+            if len(trial) == item_count:
+                break
+            recall = 0
+        else:
+            recall = trial[recall_index]
+
+        # accumulate probability of and simulate recall of indexed item
+        result += np.log(model.outcome_probabilities()[recall] + 10e-7)
+
+        if recall == 0:
+            break
+        model.force_recall(recall)
+
+    # reset model to its pre-retrieval (but post-encoding) state
+    model.force_recall(0)
+    return result
+
+def story_likelihood(model, trials):
+    """
+    Negative log-likelihood of a story's recall trials under an encoded model.
+    """
 
     result = 0.0
-    for i in prange(len(connections)):
-        similarities = connections[i]
-        item_count = len(similarities)
-        trials = data_to_fit[i]
-        likelihood = np.ones((len(trials), item_count))
+    for trial_index in range(len(trials)):
+        result -= trial_likelihood(model, trials[trial_index])
+    return result
+
+# compiled replay for jitclass models like Compiled_Semantic_CMR
+compiled_story_likelihood = njit(nogil=True)(story_likelihood)
+
+@register_jitable
+def ragged_story_likelihoods(model, recalls, trial_offsets, first_trial, stop_trial, results):
+    """
+    Writes the log-likelihood of each of a block of RaggedTrials trials into
+    the flat `results` accumulator, indexed by trial.
+    """
+
+    for trial_index in range(first_trial, stop_trial):
+        results[trial_index] = trial_likelihood(
+            model, recalls[trial_offsets[trial_index]:trial_offsets[trial_index + 1]])
+
+compiled_ragged_story_likelihoods = njit(nogil=True)(ragged_story_likelihoods)
+
+@register_jitable
+def bounded_story_likelihood(model, recalls, trial_offsets, first_trial, stop_trial, result, cutoff):
+    """
+    Adds the negative log-likelihood of a block of RaggedTrials trials to the
+    running total `result`, stopping after the trial that takes it past
+    `cutoff`. Returns the new total.
+    """
+
+    for trial_index in range(first_trial, stop_trial):
+        result -= trial_likelihood(
+            model, recalls[trial_offsets[trial_index]:trial_offsets[trial_index + 1]])
+        if result > cutoff:
+            break
+    return result
+
+compiled_bounded_story_likelihood = njit(nogil=True)(bounded_story_likelihood)
+
+class EncodingCache:
+    """
+    Bounded LRU cache of post-encoding model state.
+
+    Entries are keyed on a story's index and the parameters that affect
+    encoding, so evaluations that only move retrieval parameters
+    (`start_drift_rate`, `recall_drift_rate`, `stop_probability_*`,
+    `choice_sensitivity`, `semantic_scale`) restore Mfc, Mcf and context
+    instead of replaying `experience`. A cache should only be shared by
+    evaluations over the same list of story connections.
+    """
+
+    encoding_parameters = ('encoding_drift_rate', 'learning_rate', 'shared_support',
+                           'item_support', 'primacy_scale', 'primacy_decay')
+
+    def __init__(self, max_size=128):
+        self.max_size = max_size
+        self.states = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, story_index, parameters):
+        # parameters left at model defaults are keyed as None
+        return (story_index,) + tuple(
+            float(parameters[name]) if name in parameters else None
+            for name in self.encoding_parameters)
+
+    @staticmethod
+    def encoding_state(model):
+        """
+        Arguments to the model's load_encoding that reproduce its state.
+        """
+
+        return model.mfc, model.mcf, model.context, model.encoding_index
+
+    def get(self, key):
+        """
+        Cached state under key, or None. Cached arrays must not be modified.
+        """
+
+        state = self.states.get(key)
+        if state is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.states.move_to_end(key)
+        return state
+
+    def put(self, key, state):
+        """
+        Caches a state, evicting the least recently used.
+        """
+
+        self.states[key] = state
+        self.states.move_to_end(key)
+        while len(self.states) > self.max_size:
+            self.states.popitem(last=False)
+
+    def restore(self, model, key):
+        """
+        Loads cached post-encoding state into a freshly constructed model.
+        Returns False if no state is cached under key.
+        """
+
+        state = self.get(key)
+        if state is None:
+            return False
+        model.load_encoding(*copy_state(state))
+        return True
+
+    def store(self, model, key):
+        """
+        Caches an encoded model's state, evicting the least recently used.
+        """
+
+        self.put(key, copy_state(self.encoding_state(model)))
+
+class LandscapeEncodingCache(EncodingCache):
+    """
+    EncodingCache for LandscapeRevised, keyed on the parameters that shape
+    reading; retrieval parameters (`stop_probability_*`,
+    `choice_sensitivity`) can vary freely across cache hits.
+    """
+
+    encoding_parameters = ('decay_rate', 'memory_capacity', 'learning_rate', 'semantic_strength',
+                           'max_activity', 'min_activity')
+
+    @staticmethod
+    def encoding_state(model):
+        return model.packed_connections, model.packed_sigma, model.activations, model.cycle_index
+
+def copy_state(state):
+    return tuple(value.copy() if isinstance(value, np.ndarray) else value for value in state)
+
+class LikelihoodProfile:
+    """
+    Opt-in counters and cumulative timers for likelihood evaluation.
+
+    Passed as `profile` to semantic_data_likelihood, or enabled on
+    semantic_objective_function, it accumulates the calls and seconds spent
+    per story in each phase: `construction`, `encoding` (`experience`),
+    `cache` (restoring an encoding), `outcome_probabilities`,
+    `force_recall`, `log_likelihood` (accumulating log probabilities) and
+    `reduction` (summing trial results, under story None). jitclass models
+    replay trials inside compiled code, so their replay is timed per story
+    as one `replay` phase, and the parallel kernel as `parallel_replay`.
+    Objective functions also log each evaluation's parameters, seconds and
+    result in `evaluations`. Unprofiled evaluations skip all of this.
+    """
 
-        model = model_class(item_count, similarities, parameters)
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.phases = {}
+        self.evaluations = []
+
+    def add(self, phase, story_index, seconds, count=1):
+        entry = self.phases.get((phase, story_index))
+        if entry is None:
+            self.phases[(phase, story_index)] = [count, seconds]
+        else:
+            entry[0] += count
+            entry[1] += seconds
+
+    def record_evaluation(self, x, seconds, result):
+        self.evaluations.append((np.array(x, dtype=np.float64), seconds, result))
+
+    def phase_totals(self):
+        """
+        Maps each phase to its (calls, seconds) summed over stories.
+        """
+
+        totals = {}
+        for (phase, _), (count, seconds) in self.phases.items():
+            total = totals.setdefault(phase, [0, 0.0])
+            total[0] += count
+            total[1] += seconds
+        return {phase: tuple(total) for phase, total in totals.items()}
+
+    def story_totals(self):
+        """
+        Maps each story index to the seconds spent on it across phases.
+        """
+
+        totals = {}
+        for (_, story_index), (_, seconds) in self.phases.items():
+            if story_index is not None:
+                totals[story_index] = totals.get(story_index, 0.0) + seconds
+        return totals
+
+    def report(self):
+        lines = ['%-24s %12s %12s' % ('phase', 'calls', 'seconds')]
+        for phase, (count, seconds) in sorted(self.phase_totals().items(), key=lambda item: -item[1][1]):
+            lines.append('%-24s %12d %12.6f' % (phase, count, seconds))
+        lines.append('')
+        lines.append('%-24s %12s' % ('story', 'seconds'))
+        for story_index, seconds in sorted(self.story_totals().items()):
+            lines.append('%-24d %12.6f' % (story_index, seconds))
+        if self.evaluations:
+            times = [seconds for _, seconds, _ in self.evaluations]
+            lines.append('')
+            lines.append('%d evaluations, %.6f seconds (mean %.6f, max %.6f)' % (
+                len(times), sum(times), np.mean(times), max(times)))
+        return '\n'.join(lines)
+
+def profiled_trial_likelihood(model, trial, profile, story_index):
+    """
+    trial_likelihood, timing each phase of replay into `profile`.
+    """
+
+    clock = time.perf_counter
+    item_count = model.item_count
+    result = 0.0
+    probability_seconds = log_seconds = 0.0
+
+    start = clock()
+    model.force_recall()
+    recall_seconds = clock() - start
+    recall_calls = 1
+    scored_count = 0
+
+    for recall_index in range(len(trial) + 1):
+
+        if recall_index == len(trial):
+            if len(trial) == item_count:
+                break
+            recall = 0
+        else:
+            recall = trial[recall_index]
+
+        start = clock()
+        probabilities = model.outcome_probabilities()
+        scored = clock()
+        result += np.log(probabilities[recall] + 10e-7)
+        log_seconds += clock() - scored
+        probability_seconds += scored - start
+        scored_count += 1
+
+        if recall == 0:
+            break
+        start = clock()
+        model.force_recall(recall)
+        recall_seconds += clock() - start
+        recall_calls += 1
+
+    start = clock()
+    model.force_recall(0)
+    recall_seconds += clock() - start
+
+    profile.add('outcome_probabilities', story_index, probability_seconds, scored_count)
+    profile.add('log_likelihood', story_index, log_seconds, scored_count)
+    profile.add('force_recall', story_index, recall_seconds, recall_calls + 1)
+    return result
+
+def encoded_model(model_class, story_index, similarities, parameters, encoding_cache=None, profile=None):
+    """
+    Builds a model and brings it to its post-encoding state, from the
+    encoding cache when possible.
+    """
+
+    if profile is not None:
+        start = time.perf_counter()
+    model = model_class(len(similarities), similarities, parameters)
+    if profile is not None:
+        encoding_start = time.perf_counter()
+        profile.add('construction', story_index, encoding_start - start)
+
+    key = None if encoding_cache is None else encoding_cache.key(story_index, parameters)
+    if key is not None and encoding_cache.restore(model, key):
+        phase = 'cache'
+    else:
         model.experience(model.items)
+        if key is not None:
+            encoding_cache.store(model, key)
+        phase = 'encoding'
+
+    if profile is not None:
+        profile.add(phase, story_index, time.perf_counter() - encoding_start)
+    return model
 
-        for trial_index in range(len(trials)):
-            trial = trials[trial_index]
+def semantic_data_likelihood(data_to_fit, connections, model_class, parameters, encoding_cache=None,
+                             profile=None, cutoff=None):
+    """
+    Negative log-likelihood of recall data, given either as per-story trial
+    arrays or as RaggedTrials. Ragged data is scored into one flat per-trial
+    accumulator that is summed in trial order. Passing a LikelihoodProfile
+    as `profile` times each phase of the evaluation into it.
 
-            model.force_recall()
-            for recall_index in range(len(trial) + 1):
+    With a `cutoff`, evaluation stops at the first trial that takes the
+    running negative log-likelihood past it, and that partial total (a lower
+    bound on the full value) is returned; see bounded_data_likelihood.
+    RecallTries are scored by trie_semantic_data_likelihood.
+    """
 
-                # identify index of item recalled; if zero then recall is over
-                if recall_index == len(trial) and len(trial) < item_count:
-                    recall = 0
-                else:\
-                    recall = trial[recall_index]
+    if isinstance(data_to_fit, RecallTries):
+        return trie_semantic_data_likelihood(data_to_fit, connections, model_class, parameters, encoding_cache,
+                                             profile, cutoff)
+    if cutoff is not None:
+        return bounded_data_likelihood(data_to_fit, connections, model_class, parameters, cutoff,
+                                       encoding_cache, profile)
+    if profile is not None:
+        return profiled_semantic_data_likelihood(data_to_fit, connections, model_class, parameters, profile,
+                                                 encoding_cache)
+    if isinstance(data_to_fit, RaggedTrials):
+        return ragged_semantic_data_likelihood(data_to_fit, connections, model_class, parameters,
+                                               encoding_cache)
 
-                # store probability of and simulate recall of indexed item
-                likelihood[trial_index, recall_index] = \
-                    model.outcome_probabilities()[recall] + 10e-7
+    # jitclass models replay trials inside compiled code
+    if isinstance(model_class, JitClassType):
+        replay = compiled_story_likelihood
+    else:
+        replay = story_likelihood
 
-                if recall == 0:
-                    break
-                model.force_recall(recall)
+    result = 0.0
+    for i in range(len(connections)):
+        model = encoded_model(model_class, i, connections[i], parameters, encoding_cache)
+        result += replay(model, data_to_fit[i])
 
-            # reset model to its pre-retrieval (but post-encoding) state
-            model.force_recall(0)
+    return result
 
-        result -= np.sum(np.log(likelihood))
+def ragged_semantic_data_likelihood(data_to_fit, connections, model_class, parameters, encoding_cache=None):
 
+    # jitclass models replay trials inside compiled code
+    if isinstance(model_class, JitClassType):
+        replay = compiled_ragged_story_likelihoods
+    else:
+        replay = ragged_story_likelihoods
+
+    recalls, trial_offsets, story_offsets = data_to_fit
+    trial_results = np.zeros(len(trial_offsets) - 1)
+    for i in range(len(connections)):
+        model = encoded_model(model_class, i, connections[i], parameters, encoding_cache)
+        replay(model, recalls, trial_offsets, story_offsets[i], story_offsets[i + 1], trial_results)
+
+    result = 0.0
+    for value in trial_results:
+        result -= value
     return result
 
-def semantic_objective_function(data_to_fit, connections, model_class, fixed_parameters, free_parameters):
+def bounded_data_likelihood(data_to_fit, connections, model_class, parameters, cutoff, encoding_cache=None,
+                            profile=None):
+    """
+    Negative log-likelihood of recall data, accumulated trial by trial in
+    the order of RaggedTrials and abandoned, along with any stories not yet
+    encoded, once it exceeds `cutoff`. Evaluations that finish equal
+    ragged_semantic_data_likelihood exactly. Trial arrays are packed into
+    RaggedTrials first. A `profile` times encoding and each story's replay.
+    """
+
+    if isinstance(model_class, JitClassType):
+        replay = compiled_bounded_story_likelihood
+    else:
+        replay = bounded_story_likelihood
+
+    if not isinstance(data_to_fit, RaggedTrials):
+        data_to_fit = ragged_trials(data_to_fit)
+    recalls, trial_offsets, story_offsets = data_to_fit
+
+    result = 0.0
+    for i in range(len(connections)):
+        model = encoded_model(model_class, i, connections[i], parameters, encoding_cache, profile)
+        if profile is not None:
+            start = time.perf_counter()
+        result = replay(model, recalls, trial_offsets, story_offsets[i], story_offsets[i + 1], result,
+                        cutoff)
+        if profile is not None:
+            profile.add('replay', i, time.perf_counter() - start)
+        if result > cutoff:
+            break
+    return result
+
+@register_jitable
+def trie_story_likelihood(model, items, depths, visits, stops, first_node, stop_node):
+    """
+    Log-likelihood of a story's trials, replayed from its RecallTries nodes
+    under an encoded model.
+
+    Each distinct recall prefix is replayed once and its outcome
+    probabilities computed once, scoring every trial that shares it by
+    multiplicity. Context and outcome probabilities are kept per depth, so
+    where trials diverge the model is returned to the branch point instead
+    of replayed from the start of retrieval. The model is left in its
+    pre-retrieval (but post-encoding) state.
+    """
+
+    item_count = model.item_count
+    max_depth = 0
+    for node in range(first_node, stop_node):
+        max_depth = max(max_depth, depths[node])
+    contexts = np.zeros((max_depth + 1, len(model.context)))
+    probabilities = np.zeros((max_depth + 1, item_count + 1))
+
+    result = 0.0
+    model.force_recall()
+    previous_depth = -1
+    for node in range(first_node, stop_node):
+        depth = depths[node]
+        if depth > 0:
+            result += visits[node] * np.log(probabilities[depth - 1, items[node]] + 10e-7)
+
+            # in preorder a node's parent is the last node visited one
+            # level up; rewind to its state unless it was just visited
+            if depth != previous_depth + 1:
+                model.context[:] = contexts[depth - 1]
+                model.recall_total = depth - 1
+            model.force_recall(items[node])
+        contexts[depth] = model.context
+        previous_depth = depth
+
+        # a trial recalling every item has no stop event to score
+        if depth < item_count:
+            probabilities[depth] = model.outcome_probabilities()
+            if stops[node] > 0:
+                result += stops[node] * np.log(probabilities[depth, 0] + 10e-7)
+
+    model.force_recall(0)
+    return result
+
+compiled_trie_story_likelihood = njit(nogil=True)(trie_story_likelihood)
+
+def trie_semantic_data_likelihood(data_to_fit, connections, model_class, parameters, encoding_cache=None,
+                                  profile=None, cutoff=None):
+    """
+    Negative log-likelihood of recall data given as RecallTries (see
+    recall_tries), replaying shared recall prefixes once per story. Equals
+    semantic_data_likelihood up to rounding. A `cutoff` is checked after
+    each story; a `profile` times encoding and each story's replay.
+    """
+
+    if isinstance(model_class, JitClassType):
+        replay = compiled_trie_story_likelihood
+    else:
+        replay = trie_story_likelihood
+
+    items, depths, visits, stops, story_offsets = data_to_fit
+    result = 0.0
+    for i in range(len(connections)):
+        model = encoded_model(model_class, i, connections[i], parameters, encoding_cache, profile)
+        if profile is not None:
+            start = time.perf_counter()
+        result -= replay(model, items, depths, visits, stops, story_offsets[i], story_offsets[i + 1])
+        if profile is not None:
+            profile.add('replay', i, time.perf_counter() - start)
+        if cutoff is not None and result > cutoff:
+            break
+    return result
+
+def profiled_semantic_data_likelihood(data_to_fit, connections, model_class, parameters, profile,
+                                      encoding_cache=None):
+    """
+    semantic_data_likelihood, timing each phase into `profile`; the result
+    is the same as unprofiled evaluation.
+    """
+
+    clock = time.perf_counter
+    compiled = isinstance(model_class, JitClassType)
+    ragged = isinstance(data_to_fit, RaggedTrials)
+
+    story_results = np.zeros(len(connections))
+    if ragged:
+        recalls, trial_offsets, story_offsets = data_to_fit
+        trial_results = np.zeros(len(trial_offsets) - 1)
+
+    for i in range(len(connections)):
+        model = encoded_model(model_class, i, connections[i], parameters, encoding_cache, profile)
+        start = clock()
+        if ragged and compiled:
+            compiled_ragged_story_likelihoods(model, recalls, trial_offsets, story_offsets[i],
+                                              story_offsets[i + 1], trial_results)
+        elif ragged:
+            for trial_index in range(story_offsets[i], story_offsets[i + 1]):
+                trial_results[trial_index] = profiled_trial_likelihood(
+                    model, recalls[trial_offsets[trial_index]:trial_offsets[trial_index + 1]], profile, i)
+        elif compiled:
+            story_results[i] = compiled_story_likelihood(model, data_to_fit[i])
+        else:
+            for trial_index in range(len(data_to_fit[i])):
+                story_results[i] -= profiled_trial_likelihood(model, data_to_fit[i][trial_index], profile, i)
+        if compiled:
+            profile.add('replay', i, clock() - start)
+
+    # summed in the same order as unprofiled evaluation
+    start = clock()
+    result = 0.0
+    for value in (trial_results if ragged else story_results):
+        result += -value if ragged else value
+    profile.add('reduction', None, clock() - start)
+    return result
+
+def trial_tasks(data_to_fit, task_count):
+    """
+    Splits each story's trials into contiguous blocks for parallel replay.
+
+    Returns a (task, 3) array of story index, first trial and stop trial,
+    counted in the flat trial index of RaggedTrials, along with the offset
+    of each story's trials in that index.
+    """
+
+    if isinstance(data_to_fit, RaggedTrials):
+        trial_offsets = np.asarray(data_to_fit.story_offsets, dtype=np.int64)
+    else:
+        trial_offsets = np.zeros(len(data_to_fit) + 1, dtype=np.int64)
+        trial_offsets[1:] = np.cumsum([len(trials) for trials in data_to_fit])
+
+    # blocks are sized against the whole dataset so large stories get more
+    block_size = max(1, -(-trial_offsets[-1] // max(task_count, 1)))
+    tasks = []
+    for story_index in range(len(trial_offsets) - 1):
+        for start in range(trial_offsets[story_index], trial_offsets[story_index + 1], block_size):
+            tasks.append((story_index, start, min(start + block_size, trial_offsets[story_index + 1])))
+    return np.array(tasks, dtype=np.int64).reshape(-1, 3), trial_offsets
+
+def parallel_likelihood_kernel(model_class):
+    """
+    Builds (and caches) the parallel replay kernel for a jitclass model.
+
+    numba cannot accept classes as arguments, so each model class gets its
+    own kernel with the class bound as a compile-time constant.
+    """
+
+    if model_class in _parallel_kernels:
+        return _parallel_kernels[model_class]
+
+    @njit(nogil=True, parallel=True)
+    def kernel(recalls, trial_offsets, connections, parameters, encoded, pending, tasks):
+
+        # encode each pending story once; its trials share the post-encoding state
+        for i in prange(len(encoded)):
+            if pending[i]:
+                model = encoded[np.int64(i)]
+                model.experience(model.items)
+
+        # each task replays a block of trials from a copy of that state
+        trial_results = np.zeros(len(trial_offsets) - 1)
+        for task_index in prange(len(tasks)):
+            story_index, start, stop = tasks[task_index]
+            source = encoded[story_index]
+            similarities = connections[story_index]
+
+            model = model_class(len(similarities), similarities, parameters)
+            model.load_encoding(source.mfc, source.mcf, source.context.copy(), source.encoding_index)
+            ragged_story_likelihoods(model, recalls, trial_offsets, start, stop, trial_results)
+
+        # fixed-order serial reduction keeps the result bit-stable
+        result = 0.0
+        for i in range(len(trial_results)):
+            result -= trial_results[i]
+        return result
+
+    _parallel_kernels[model_class] = kernel
+    return kernel
+
+_parallel_kernels = {}
+
+def parallel_semantic_data_likelihood(data_to_fit, connections, model_class, parameters, task_count=None,
+                                      encoding_cache=None, profile=None):
+    """
+    Parallel counterpart of semantic_data_likelihood for jitclass models.
+
+    Stories are encoded concurrently and blocks of trials are then replayed
+    concurrently from each story's shared post-encoding state. Every trial's
+    log-likelihood is stored separately and summed in a fixed order, so the
+    result does not depend on the number of worker threads (see
+    `numba.set_num_threads`). `task_count` sets how many trial blocks are
+    formed and defaults to four per worker thread. Stories found in
+    `encoding_cache` skip encoding. Trial arrays are packed into
+    RaggedTrials for replay; pass RaggedTrials to skip that step. With a
+    LikelihoodProfile as `profile`, model construction and cache restores
+    are timed per story, and the kernel (encoding and replay) as a whole.
+    """
+
+    if not isinstance(model_class, JitClassType):
+        raise ValueError('parallel likelihood requires a jitclass model such as Compiled_Semantic_CMR')
+
+    # restore cached stories; the rest are encoded inside the kernel
+    encoded = List()
+    pending = np.ones(len(connections), dtype=np.bool_)
+    keys = []
+    for i in range(len(connections)):
+        if profile is not None:
+            start = time.perf_counter()
+        model = model_class(len(connections[i]), connections[i], parameters)
+        if profile is not None:
+            restore_start = time.perf_counter()
+            profile.add('construction', i, restore_start - start)
+        if encoding_cache is not None:
+            keys.append(encoding_cache.key(i, parameters))
+            pending[i] = not encoding_cache.restore(model, keys[i])
+            if profile is not None and not pending[i]:
+                profile.add('cache', i, time.perf_counter() - restore_start)
+        encoded.append(model)
+
+    if not isinstance(data_to_fit, RaggedTrials):
+        data_to_fit = ragged_trials(data_to_fit)
+    if task_count is None:
+        task_count = 4 * get_num_threads()
+    tasks = trial_tasks(data_to_fit, task_count)[0]
+    if profile is not None:
+        start = time.perf_counter()
+    result = parallel_likelihood_kernel(model_class)(
+        data_to_fit.recalls, data_to_fit.trial_offsets, connections, parameters, encoded, pending, tasks)
+    if profile is not None:
+        profile.add('parallel_replay', None, time.perf_counter() - start)
+
+    if encoding_cache is not None:
+        for i in np.flatnonzero(pending):
+            encoding_cache.store(encoded[i], keys[i])
+    return result
+
+def semantic_objective_function(data_to_fit, connections, model_class, fixed_parameters, free_parameters,
+                                parallel=False, cache_size=128, profile=False, cutoff=None,
+                                share_prefixes=False):
     """
     Configures cmr_likelihood for search over specified free/fixed parameters.
+
+    With `parallel=True`, evaluations use parallel_semantic_data_likelihood.
+    Post-encoding states of up to `cache_size` story/parameter combinations
+    are reused across evaluations; `cache_size=0` disables the cache, which
+    is exposed as the returned function's `encoding_cache` attribute. With
+    `profile=True` (or a LikelihoodProfile to share), every evaluation is
+    timed by phase and story into the function's `profile` attribute.
+
+    A `cutoff` makes evaluations stop early once their negative
+    log-likelihood passes it, returning that partial value (see
+    bounded_data_likelihood). It is read from the returned function's
+    `cutoff` attribute on every call, so a search can tighten it as its
+    population improves. Parallel evaluation does not support a cutoff,
+    whether given here or set later.
+
+    With `share_prefixes=True` trials are packed into RecallTries, so
+    recall prefixes shared by several trials of a story are scored once
+    (see trie_semantic_data_likelihood); a cutoff is then checked per story.
     """
 
+    def check_cutoff(cutoff):
+        if parallel and cutoff is not None:
+            raise ValueError('cutoff is only supported by serial evaluation')
+
+    check_cutoff(cutoff)
+    if parallel and share_prefixes:
+        raise ValueError('share_prefixes is only supported by serial evaluation')
+
+    likelihood = parallel_semantic_data_likelihood if parallel else semantic_data_likelihood
+    encoding_cache = EncodingCache(cache_size) if cache_size > 0 else None
+    if profile is True:
+        profile = LikelihoodProfile()
+    elif profile is False:
+        profile = None
+
+    # trials are packed once rather than on every evaluation
+    if share_prefixes:
+        if not isinstance(data_to_fit, RecallTries):
+            data_to_fit = recall_tries(data_to_fit)
+    elif not isinstance(data_to_fit, RaggedTrials):
+        data_to_fit = ragged_trials(data_to_fit)
+
     parameters = Dict.empty(key_type=types.unicode_type, value_type=types.float64)
     for name, value in fixed_parameters.items():
         parameters[name] = value
@@ -62,6 +729,232 @@ def semantic_objective_function(data_to_fit, connections, model_class, fixed_par
     def objective_function(x):
         for i in range(len(free_parameters)):
             parameters[free_parameters[i]] = x[i]
-        return semantic_data_likelihood(data_to_fit, connections, model_class, parameters)
 
-    return objective_function
\ No newline at end of file
+        # parallel evaluation takes no cutoff, so one is only passed when set
+        check_cutoff(objective_function.cutoff)
+        bounds = {} if objective_function.cutoff is None else {'cutoff': objective_function.cutoff}
+        if profile is None:
+            return likelihood(data_to_fit, connections, model_class, parameters,
+                              encoding_cache=encoding_cache, **bounds)
+
+        start = time.perf_counter()
+        result = likelihood(data_to_fit, connections, model_class, parameters,
+                            encoding_cache=encoding_cache, profile=profile, **bounds)
+        profile.record_evaluation(x, time.perf_counter() - start, result)
+        return result
+
+    objective_function.encoding_cache = encoding_cache
+    objective_function.profile = profile
+    objective_function.cutoff = cutoff
+    return objective_function
+
+def batched_semantic_objective_function(data_to_fit, connections, fixed_parameters, free_parameters):
+    """
+    Configures a population-wide objective over specified free/fixed parameters.
+
+    The returned function takes an (N, k) array holding N candidate vectors of
+    the k free parameters (as produced by differential evolution or CMA-ES)
+    and returns their N negative log-likelihoods, evaluated together by
+    Batched_Semantic_CMR. For scipy's `differential_evolution(...,
+    vectorized=True)`, which passes candidates as columns, call it on `x.T`.
+    Recall data may be per-story trial arrays or RaggedTrials; RecallTries
+    rewind a single model's recall state and are not supported.
+    """
+
+    if isinstance(data_to_fit, RecallTries):
+        raise ValueError('batched objectives take trial arrays or RaggedTrials, not RecallTries')
+
+    def objective_function(population):
+        population = np.atleast_2d(population)
+        parameters = dict(fixed_parameters)
+        for i in range(len(free_parameters)):
+            parameters[free_parameters[i]] = population[:, i]
+        if not isinstance(data_to_fit, RaggedTrials):
+            return semantic_data_likelihood(data_to_fit, connections, Batched_Semantic_CMR, parameters)
+
+        # each trial scores every population member at once, so results
+        # are accumulated per member rather than in a flat per-trial array
+        recalls, trial_offsets, story_offsets = data_to_fit
+        result = np.zeros(len(population))
+        for i in range(len(connections)):
+            model = encoded_model(Batched_Semantic_CMR, i, connections[i], parameters)
+            for trial_index in range(story_offsets[i], story_offsets[i + 1]):
+                result -= trial_likelihood(model, recalls[trial_offsets[trial_index]:trial_offsets[trial_index + 1]])
+        return result
+
+    return objective_function
+
+# Cell
+
+def landscape_story_likelihoods(similarities, cycles, trials, parameters, state=None):
+    """
+    Log-likelihood of each of a story's recall trials under LandscapeRevised.
+
+    The story is read cycle by cycle unless a post-encoding `state` (as
+    recorded by LandscapeEncodingCache) is given. Returns the per-trial
+    log-likelihoods along with the post-encoding state when encoding was
+    performed here, else None.
+    """
+
+    model = LandscapeRevised(similarities, **parameters)
+    if state is None:
+        model.experience(cycles)
+        encoded_state = copy_state(LandscapeEncodingCache.encoding_state(model))
+    else:
+        model.load_encoding(*copy_state(state))
+        encoded_state = None
+
+    results = np.zeros(len(trials))
+    for trial_index in range(len(trials)):
+        results[trial_index] = trial_likelihood(model, trials[trial_index])
+    return results, encoded_state
+
+def _cached_landscape_story_likelihoods(story_index, similarities, cycles, trials, parameters,
+                                        encoding_cache=None):
+    key = None if encoding_cache is None else encoding_cache.key(story_index, parameters)
+    state = None if key is None else encoding_cache.get(key)
+    results, encoded_state = landscape_story_likelihoods(similarities, cycles, trials, parameters, state)
+    if key is not None and encoded_state is not None:
+        encoding_cache.put(key, encoded_state)
+    return results
+
+# stories and encoding cache of a landscape_executor worker, set once when
+# the worker starts so that evaluations only send parameters
+_landscape_worker = {}
+
+def _initialize_landscape_worker(data_to_fit, connections, cycles, cache_size):
+    _landscape_worker['stories'] = (data_to_fit, connections, cycles)
+    _landscape_worker['encoding_cache'] = LandscapeEncodingCache(cache_size) if cache_size > 0 else None
+
+def _landscape_worker_likelihoods(story_index, parameters):
+    data_to_fit, connections, cycles = _landscape_worker['stories']
+    return _cached_landscape_story_likelihoods(story_index, connections[story_index], cycles[story_index],
+                                               data_to_fit[story_index], parameters,
+                                               _landscape_worker['encoding_cache'])
+
+def landscape_executor(data_to_fit, connections, cycles, max_workers=None, cache_size=128):
+    """
+    Process pool for landscape_data_likelihood's `executor`.
+
+    Each worker receives the stories once, when it starts, and keeps its own
+    LandscapeEncodingCache of `cache_size` states, so evaluations send
+    workers only story indices and parameters and get back per-trial
+    results. Shut the pool down (or use it in a `with` block) when done.
+    """
+
+    stories = ([np.asarray(trials) for trials in data_to_fit],
+               [np.asarray(similarities) for similarities in connections],
+               [list(story_cycles) for story_cycles in cycles])
+    return ProcessPoolExecutor(max_workers=max_workers, initializer=_initialize_landscape_worker,
+                               initargs=stories + (cache_size,))
+
+def landscape_data_likelihood(data_to_fit, connections, cycles, parameters, encoding_cache=None,
+                              executor=None):
+    """
+    Negative log-likelihood of recall data under LandscapeRevised.
+
+    `cycles` holds each story's reading cycles (lists of unit indices) and
+    `parameters` maps LandscapeRevised's keyword arguments to values. Stories
+    are scored in turn, skipping reading for those found in `encoding_cache`,
+    or by the workers of `executor`, which must come from
+    landscape_executor over the same stories and use their own caches.
+    Per-trial results are summed in a fixed order either way, so the result
+    does not depend on how stories are spread across workers.
+    """
+
+    if executor is None:
+        outcomes = [_cached_landscape_story_likelihoods(i, connections[i], cycles[i], data_to_fit[i], parameters,
+                                                        encoding_cache)
+                    for i in range(len(connections))]
+    else:
+        outcomes = executor.map(_landscape_worker_likelihoods, range(len(connections)),
+                                [parameters] * len(connections))
+
+    result = 0.0
+    for trial_results in outcomes:
+        for value in trial_results:
+            result -= value
+    return result
+
+class LandscapeObjectiveFunction:
+    """
+    landscape_data_likelihood over specified free/fixed parameters, as
+    configured by landscape_objective_function.
+
+    Calls take a vector of free parameter values. `close` shuts down the
+    process pool, if any, as does leaving a `with` block; evaluations after
+    that run in-process.
+    """
+
+    def __init__(self, data_to_fit, connections, cycles, fixed_parameters, free_parameters, encoding_cache=None,
+                 executor=None):
+        self.data_to_fit = data_to_fit
+        self.connections = connections
+        self.cycles = cycles
+        self.parameters = dict(fixed_parameters)
+        self.free_parameters = free_parameters
+        self.encoding_cache = encoding_cache
+        self.executor = executor
+
+    def __call__(self, x):
+        for i in range(len(self.free_parameters)):
+            self.parameters[self.free_parameters[i]] = float(x[i])
+        return landscape_data_likelihood(self.data_to_fit, self.connections, self.cycles, self.parameters,
+                                         encoding_cache=self.encoding_cache, executor=self.executor)
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+def landscape_objective_function(data_to_fit, connections, cycles, fixed_parameters, free_parameters,
+                                 parallel=False, cache_size=128, max_workers=None):
+    """
+    Configures landscape_data_likelihood for search over specified
+    free/fixed parameters.
+
+    With `parallel=True`, stories are scored on a landscape_executor pool of
+    `max_workers`, kept as the returned objective's `executor` until its
+    `close` (or the end of a `with` block). Post-encoding states are cached
+    as in semantic_objective_function, by each worker when parallel and
+    otherwise in the objective's `encoding_cache`.
+    """
+
+    encoding_cache = LandscapeEncodingCache(cache_size) if cache_size > 0 else None
+    executor = None
+    if parallel:
+        executor = landscape_executor(data_to_fit, connections, cycles, max_workers, cache_size)
+    return LandscapeObjectiveFunction(data_to_fit, connections, cycles, fixed_parameters, free_parameters,
+                                      encoding_cache, executor)
+
+def batched_landscape_objective_function(data_to_fit, connections, cycles, fixed_parameters, free_parameters):
+    """
+    Configures a population-wide LandscapeRevised objective over specified
+    free/fixed parameters.
+
+    The returned function takes an (N, k) array of N candidate vectors of the
+    k free parameters (e.g. the points of a grid) and returns their N
+    negative log-likelihoods, with every candidate reading each story
+    together in Batched_LandscapeRevised.
+    """
+
+    def objective_function(population):
+        population = np.atleast_2d(population)
+        parameters = dict(fixed_parameters)
+        for i in range(len(free_parameters)):
+            parameters[free_parameters[i]] = population[:, i]
+
+        result = np.zeros(len(population))
+        for i in range(len(connections)):
+            model = Batched_LandscapeRevised(connections[i], **parameters)
+            model.experience(cycles[i])
+            result += story_likelihood(model, data_to_fit[i])
+        return result
+
+    return objective_function
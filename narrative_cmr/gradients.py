@@ -0,0 +1,292 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: notebooks/model_evaluation/Likelihood_Gradients.ipynb (unless otherwise specified).
+
+__all__ = ['parameter_tangents', 'normalize_tangent', 'drift_tangent', 'encoding_tangents', 'outcome_tangents',
+           'trie_story_gradient', 'semantic_likelihood_gradient', 'finite_difference_gradient',
+           'semantic_gradient_objective_function']
+
+# Cell
+# hide
+
+import numpy as np
+from .datasets import RecallTries, recall_tries
+
+# Cell
+
+def parameter_tangents(parameters, free_parameters):
+    """
+    Maps each Semantic_CMR parameter to its value and forward-mode tangent,
+    its derivative with respect to each of `free_parameters` (one-hot for a
+    free parameter, zeros for a fixed one).
+    """
+
+    free_parameters = list(free_parameters)
+    tangents = {}
+    for name in parameters:
+        tangent = np.zeros(len(free_parameters))
+        if name in free_parameters:
+            tangent[free_parameters.index(name)] = 1
+        tangents[name] = (float(parameters[name]), tangent)
+    return tangents
+
+def normalize_tangent(retrieved, tangent):
+    """
+    Semantic_CMR.normalize_context_input with its tangent. Tangents carry a
+    trailing axis over free parameters.
+    """
+
+    norm = np.sqrt(np.sum(np.square(retrieved)))
+    normalized = retrieved / norm
+    return normalized, (tangent - np.outer(normalized, normalized @ tangent)) / norm
+
+def drift_tangent(context, context_tangent, context_input, input_tangent, drift_rate, rate_tangent):
+    """
+    Semantic_CMR.drift_context with its tangent.
+    """
+
+    # drift rates are clipped at 1, beyond which they have no effect
+    if drift_rate > 1.0:
+        drift_rate, rate_tangent = 1.0, np.zeros_like(rate_tangent)
+
+    overlap = context * context_input
+    overlap_tangent = context_tangent * context_input[:, None] + context[:, None] * input_tangent
+    root = np.sqrt((np.square(overlap) - 1) * np.square(drift_rate) + 1)
+    root_tangent = (np.outer(np.square(overlap) - 1, drift_rate * rate_tangent)
+                    + np.square(drift_rate) * overlap[:, None] * overlap_tangent) / root[:, None]
+    rho = root - overlap * drift_rate
+    rho_tangent = root_tangent - np.outer(overlap, rate_tangent) - drift_rate * overlap_tangent
+
+    updated = context * rho + context_input * drift_rate
+    updated_tangent = (rho_tangent * context[:, None] + rho[:, None] * context_tangent
+                       + np.outer(context_input, rate_tangent) + drift_rate * input_tangent)
+    return updated, updated_tangent
+
+def encoding_tangents(similarities, tangents):
+    """
+    Post-encoding Mfc, retrieval matrix (Mcf plus scaled similarities) and
+    context of Semantic_CMR after studying each item once in order, as
+    `model.experience(model.items)` does, each with its tangent.
+    """
+
+    item_count = len(similarities)
+    free_count = len(tangents['learning_rate'][1])
+    learning_rate, learning_tangent = tangents['learning_rate']
+    drift_rate, rate_tangent = tangents['encoding_drift_rate']
+
+    # pre-experimental associations
+    pre_mfc = np.eye(item_count, item_count + 2, 1)
+    mfc = pre_mfc * (1 - learning_rate)
+    mfc_tangent = -pre_mfc[:, :, None] * learning_tangent
+
+    pre_mcf = np.eye(item_count, item_count)
+    shared_support, shared_tangent = tangents['shared_support']
+    item_support, item_tangent = tangents['item_support']
+    mcf = np.zeros((item_count + 2, item_count))
+    mcf[1:-1] = np.ones((item_count, item_count)) * shared_support
+    mcf[1:-1][pre_mcf > 0] = item_support
+    mcf_tangent = np.zeros((item_count + 2, item_count, free_count))
+    mcf_tangent[1:-1] = ((1 - pre_mcf)[:, :, None] * shared_tangent + pre_mcf[:, :, None] * item_tangent)
+
+    # each item retrieves its pre-experimental context input
+    context = np.zeros(item_count + 2)
+    context[0] = 1
+    context_tangent = np.zeros((item_count + 2, free_count))
+    contexts = np.zeros((item_count, item_count + 2))
+    context_tangents = np.zeros((item_count, item_count + 2, free_count))
+    for i in range(item_count):
+        context_input, input_tangent = normalize_tangent(mfc[i], mfc_tangent[i])
+        context, context_tangent = drift_tangent(
+            context, context_tangent, context_input, input_tangent, drift_rate, rate_tangent)
+        contexts[i] = context
+        context_tangents[i] = context_tangent
+
+    # both matrices then learn the context trajectory
+    primacy_scale, scale_tangent = tangents['primacy_scale']
+    primacy_decay, decay_tangent = tangents['primacy_decay']
+    decay = np.exp(-primacy_decay * np.arange(item_count))
+    weighting = primacy_scale * decay + 1
+    weighting_tangent = np.outer(decay, scale_tangent) - np.outer(
+        primacy_scale * np.arange(item_count) * decay, decay_tangent)
+
+    mfc = mfc + learning_rate * contexts
+    mfc_tangent = mfc_tangent + contexts[:, :, None] * learning_tangent + learning_rate * context_tangents
+    mcf = mcf + contexts.T * weighting
+    mcf_tangent = (mcf_tangent + np.transpose(context_tangents, (1, 0, 2)) * weighting[None, :, None]
+                   + contexts.T[:, :, None] * weighting_tangent[None])
+
+    semantic_scale, semantic_tangent = tangents['semantic_scale']
+    padded = np.vstack((np.zeros((1, item_count)), similarities, np.zeros((1, item_count))))
+    retrieval_matrix = mcf + semantic_scale * padded
+    retrieval_tangent = mcf_tangent + padded[:, :, None] * semantic_tangent
+    return mfc, mfc_tangent, retrieval_matrix, retrieval_tangent, context, context_tangent
+
+def outcome_tangents(context, context_tangent, retrieval_matrix, retrieval_tangent, recalled, tangents):
+    """
+    Semantic_CMR.outcome_probabilities with their tangents, given the
+    indices of items already recalled.
+    """
+
+    item_count = retrieval_matrix.shape[1]
+    recall_total = len(recalled)
+    probabilities = np.full(item_count + 1, 10e-7)
+    probability_tangents = np.zeros((item_count + 1, context_tangent.shape[1]))
+
+    scale, scale_tangent = tangents['stop_probability_scale']
+    growth, growth_tangent = tangents['stop_probability_growth']
+    stop_probability = scale * np.exp(recall_total * growth)
+    limit = 1.0 - ((item_count - recall_total) * 10e-7)
+
+    # past the limit the stop probability is clipped, and items keep their floor
+    if stop_probability >= limit:
+        probabilities[0] = limit
+        return probabilities, probability_tangents
+
+    stop_tangent = np.exp(recall_total * growth) * scale_tangent + stop_probability * recall_total * growth_tangent
+    probabilities[0] = stop_probability
+    probability_tangents[0] = stop_tangent
+
+    activation = np.dot(context, retrieval_matrix) + 10e-7
+    activation_tangent = np.tensordot(context, retrieval_tangent, axes=1) + np.dot(retrieval_matrix.T, context_tangent)
+    activation[recalled] = 0
+    activation_tangent[recalled] = 0
+    if np.sum(activation) <= 0:
+        return probabilities, probability_tangents
+
+    # power sampling rule; recalled items stay at zero
+    sensitivity, sensitivity_tangent = tangents['choice_sensitivity']
+    powered = np.power(activation, sensitivity)
+    active = activation > 0
+    powered_tangent = np.zeros_like(activation_tangent)
+    powered_tangent[active] = (
+        (sensitivity * np.power(activation[active], sensitivity - 1))[:, None] * activation_tangent[active]
+        + np.outer(powered[active] * np.log(activation[active]), sensitivity_tangent))
+
+    total = np.sum(powered)
+    total_tangent = np.sum(powered_tangent, axis=0)
+    probabilities[1:] = powered * (1 - stop_probability) / total
+    probability_tangents[1:] = ((powered_tangent * (1 - stop_probability) - np.outer(powered, stop_tangent)) / total
+                                - np.outer(probabilities[1:], total_tangent) / total)
+    return probabilities, probability_tangents
+
+def trie_story_gradient(similarities, tangents, items, depths, visits, stops):
+    """
+    Log-likelihood of a story's trials, given as its RecallTries nodes, and
+    its gradient over the free parameters of `tangents`. As in
+    trie_story_likelihood, each distinct recall prefix is replayed once.
+    """
+
+    item_count = len(similarities)
+    mfc, mfc_tangent, retrieval_matrix, retrieval_tangent, context, context_tangent = encoding_tangents(
+        similarities, tangents)
+
+    # recalled items cue context with their normalized rows of Mfc
+    inputs = np.zeros_like(mfc)
+    input_tangents = np.zeros_like(mfc_tangent)
+    for i in range(item_count):
+        inputs[i], input_tangents[i] = normalize_tangent(mfc[i], mfc_tangent[i])
+
+    # retrieval starts by drifting toward the start-of-list context
+    start_input = np.zeros(item_count + 2)
+    start_input[0] = 1
+    start_rate, start_tangent = tangents['start_drift_rate']
+    context, context_tangent = drift_tangent(
+        context, context_tangent, start_input, np.zeros_like(context_tangent), start_rate, start_tangent)
+    recall_rate, recall_tangent = tangents['recall_drift_rate']
+
+    # states of the current path through the trie, by depth
+    max_depth = max(depths)
+    contexts = np.zeros((max_depth + 1,) + context.shape)
+    context_tangents = np.zeros((max_depth + 1,) + context_tangent.shape)
+    probabilities = np.zeros((max_depth + 1, item_count + 1))
+    probability_tangents = np.zeros((max_depth + 1, item_count + 1, context_tangent.shape[1]))
+    path = np.zeros(max_depth + 1, dtype=np.int64)
+
+    result = 0.0
+    gradient = np.zeros(context_tangent.shape[1])
+    for node in range(len(items)):
+        depth = depths[node]
+        if depth > 0:
+            item = items[node]
+            probability = probabilities[depth - 1, item] + 10e-7
+            result += visits[node] * np.log(probability)
+            gradient += visits[node] * probability_tangents[depth - 1, item] / probability
+
+            path[depth - 1] = item - 1
+            context, context_tangent = drift_tangent(
+                contexts[depth - 1], context_tangents[depth - 1], inputs[item - 1], input_tangents[item - 1],
+                recall_rate, recall_tangent)
+        contexts[depth] = context
+        context_tangents[depth] = context_tangent
+
+        # a trial recalling every item has no stop event to score
+        if depth < item_count:
+            probabilities[depth], probability_tangents[depth] = outcome_tangents(
+                context, context_tangent, retrieval_matrix, retrieval_tangent, path[:depth], tangents)
+            if stops[node] > 0:
+                probability = probabilities[depth, 0] + 10e-7
+                result += stops[node] * np.log(probability)
+                gradient += stops[node] * probability_tangents[depth, 0] / probability
+
+    return result, gradient
+
+def semantic_likelihood_gradient(data_to_fit, connections, parameters, free_parameters):
+    """
+    Negative log-likelihood of recall data under Semantic_CMR, as computed
+    by semantic_data_likelihood, along with its gradient with respect to
+    `free_parameters` (names of entries of `parameters`).
+
+    The gradient is exact, computed in forward mode: every quantity of the
+    model is carried along with its derivatives through encoding, context
+    drift and outcome_probabilities. Data may be RecallTries, RaggedTrials
+    or per-story trial arrays; anything but RecallTries is packed into them
+    first, so shared recall prefixes are differentiated once.
+    """
+
+    if not isinstance(data_to_fit, RecallTries):
+        data_to_fit = recall_tries(data_to_fit)
+    items, depths, visits, stops, story_offsets = data_to_fit
+    tangents = parameter_tangents(parameters, free_parameters)
+
+    result = 0.0
+    gradient = np.zeros(len(free_parameters))
+    for i in range(len(connections)):
+        start, stop = story_offsets[i], story_offsets[i + 1]
+        story_result, story_gradient = trie_story_gradient(
+            np.asarray(connections[i]), tangents, items[start:stop], depths[start:stop], visits[start:stop],
+            stops[start:stop])
+        result -= story_result
+        gradient -= story_gradient
+    return result, gradient
+
+def finite_difference_gradient(function, x, step=1e-6):
+    """
+    Central finite-difference gradient of a scalar function, for checking
+    analytic gradients.
+    """
+
+    x = np.asarray(x, dtype=np.float64)
+    gradient = np.zeros(len(x))
+    for i in range(len(x)):
+        offset = np.zeros(len(x))
+        offset[i] = step
+        gradient[i] = (function(x + offset) - function(x - offset)) / (2 * step)
+    return gradient
+
+def semantic_gradient_objective_function(data_to_fit, connections, fixed_parameters, free_parameters):
+    """
+    Configures semantic_likelihood_gradient for gradient-based search over
+    specified free/fixed parameters. The returned function maps a vector of
+    free parameter values to (negative log-likelihood, gradient), as taken
+    by e.g. `scipy.optimize.minimize(..., jac=True)`.
+    """
+
+    # trials are packed into recall tries once rather than every evaluation
+    if not isinstance(data_to_fit, RecallTries):
+        data_to_fit = recall_tries(data_to_fit)
+    parameters = dict(fixed_parameters)
+
+    def objective_function(x):
+        for i in range(len(free_parameters)):
+            parameters[free_parameters[i]] = x[i]
+        return semantic_likelihood_gradient(data_to_fit, connections, parameters, free_parameters)
+
+    return objective_function
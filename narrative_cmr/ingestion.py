@@ -0,0 +1,266 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: notebooks/data_preparation/Ingestion.ipynb (unless otherwise specified).
+
+__all__ = ['story_names', 'psifr_columns', 'read_unit_cycles', 'recall_events', 'narrative_recall_sources',
+           'file_digest', 'ingest_recall_data', 'write_psifr_csv', 'TranscriptKey', 'parse_transcript_name',
+           'docx_text', 'extract_transcripts']
+
+# Cell
+# hide
+
+import os
+import csv
+import glob
+import json
+import hashlib
+
+story_names = ['Fisherman', 'Supermarket', 'Flight', 'Cat', 'Fog', 'Beach']
+
+psifr_columns = ['subject', 'list', 'trial_type', 'position', 'item', 'item_index', 'cycle',
+                 'story_index', 'story_name', 'time_test']
+
+def read_unit_cycles(psifr_csv):
+    """
+    Reading cycle of each unit of each story, from the study events of an
+    existing psifr CSV. Raw recall files do not record cycles.
+    """
+
+    unit_cycles = {}
+    with open(psifr_csv, newline='') as f:
+        for row in csv.DictReader(f):
+            if row['trial_type'] == 'study':
+                unit_cycles.setdefault(int(row['story_index']), {})[int(row['item_index'])] = int(row['cycle'])
+    return {story: [cycles[unit] for unit in sorted(cycles)] for story, cycles in unit_cycles.items()}
+
+def recall_events(path, subject, unit_cycles):
+    """
+    Streams psifr study and recall events from one subject's raw recall
+    file (`data/raw/narrativerecalldata/*.csv`, or tab-separated like
+    `brownschmidtpartitionings.tsv`).
+
+    Each row of a raw file is a studied unit (`serialPos`), recalled at
+    output position `posRec` if that is given (the `recalled` flag is not
+    always consistent with it). Rows without a serial position
+    (recalls matching no unit) are skipped, as are recalls of units given
+    several output positions (e.g. `8;10`). Each story/timeTest pair becomes
+    a list numbered `3 * story_index + timeTest - 1`, whose study events
+    are yielded followed by its recall events, both in serial order.
+    """
+
+    def events(rows):
+        story_index, time_test = int(rows[0]['story']) - 1, int(rows[0]['timeTest'])
+        shared = {'subject': subject, 'list': 3 * story_index + time_test - 1,
+                  'story_index': story_index, 'story_name': story_names[story_index], 'time_test': time_test}
+
+        recalls = []
+        for row in rows:
+            if row['serialPos'] == '':
+                continue
+            item_index = int(float(row['serialPos'])) - 1
+            unit = dict(shared, item=row['origText'], item_index=item_index,
+                        cycle=unit_cycles[story_index][item_index])
+            yield dict(unit, trial_type='study', position=item_index + 1)
+            if row['posRec'] not in ('', 'NaN') and ';' not in row['posRec']:
+                recalls.append(dict(unit, trial_type='recall', position=int(float(row['posRec']))))
+        yield from recalls
+
+    delimiter = '\t' if path.endswith('.tsv') else ','
+    with open(path, newline='') as f:
+        rows = []
+        for row in csv.DictReader(f, delimiter=delimiter):
+            if rows and (row['story'], row['timeTest']) != (rows[0]['story'], rows[0]['timeTest']):
+                yield from events(rows)
+                rows = []
+            rows.append(row)
+        if rows:
+            yield from events(rows)
+
+def narrative_recall_sources(raw_directory):
+    """
+    Maps subject ids to the raw recall files of a directory named by
+    subject, as in `data/raw/narrativerecalldata`.
+    """
+
+    paths = glob.glob(os.path.join(raw_directory, '*.csv'))
+    return {int(os.path.splitext(os.path.basename(path))[0]): path for path in paths}
+
+def file_digest(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def ingest_recall_data(sources, store_path, unit_cycles):
+    """
+    Converts raw recall files into psifr events, one part file per subject,
+    reprocessing only files whose content changed since the last run.
+
+    `sources` maps subject ids to raw files (see narrative_recall_sources)
+    and `unit_cycles` maps story indices to per-unit reading cycles (see
+    read_unit_cycles). The store's `manifest.json` records each subject's
+    source and content hash; parts of subjects no longer in `sources` are
+    dropped. Returns the subject ids that were (re)processed.
+    """
+
+    parts_path = os.path.join(store_path, 'parts')
+    manifest_path = os.path.join(store_path, 'manifest.json')
+    os.makedirs(parts_path, exist_ok=True)
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+    processed = []
+    entries = {}
+    for subject in sorted(sources):
+        path = sources[subject]
+        digest = file_digest(path)
+        part = os.path.join(parts_path, '%d.csv' % subject)
+        entry = manifest.get(str(subject))
+        if entry is None or entry['sha256'] != digest or not os.path.exists(part):
+
+            # parts are written aside and renamed, so an interrupted run
+            # never leaves a truncated part behind a current manifest entry
+            with open(part + '.partial', 'w', newline='') as f:
+                writer = csv.DictWriter(f, psifr_columns, lineterminator='\n')
+                writer.writerows(recall_events(path, subject, unit_cycles))
+            os.replace(part + '.partial', part)
+            processed.append(subject)
+        entries[str(subject)] = {'source': os.path.abspath(path), 'sha256': digest}
+
+    for subject in set(manifest) - set(entries):
+        part = os.path.join(parts_path, '%s.csv' % subject)
+        if os.path.exists(part):
+            os.remove(part)
+
+    with open(manifest_path + '.partial', 'w') as f:
+        json.dump(entries, f, indent=1, sort_keys=True)
+    os.replace(manifest_path + '.partial', manifest_path)
+    return processed
+
+def write_psifr_csv(store_path, csv_path):
+    """
+    Assembles the ingested parts, in subject order, into one psifr CSV
+    (the format of `data/psifr_sbs.csv`) without reparsing them.
+    """
+
+    with open(os.path.join(store_path, 'manifest.json')) as f:
+        subjects = sorted(int(subject) for subject in json.load(f))
+
+    with open(csv_path, 'w', newline='') as output:
+        output.write(','.join(psifr_columns) + '\n')
+        for subject in subjects:
+            with open(os.path.join(store_path, 'parts', '%d.csv' % subject), newline='') as part:
+                for chunk in iter(lambda: part.read(1 << 20), ''):
+                    output.write(chunk)
+
+# Cell
+
+import re
+import zipfile
+import xml.etree.ElementTree as ElementTree
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+TranscriptKey = namedtuple('TranscriptKey', ['subject', 'session', 'condition', 'date', 'story', 'time_test'])
+
+_transcript_name = re.compile(
+    r'^(\d+)[_.](\d+)[_.](\d+)[_.](\d+\.\d+\.\d+)\s*'
+    r'\((?:(\d+)\.(\d+)|part\s*\d+\s*story\s*(\d+)|(\d+))\)\.docx$', re.IGNORECASE)
+
+def parse_transcript_name(path):
+    """
+    TranscriptKey of a written-recall transcript named by the study's
+    convention, `subject_session_condition_MM.DD.YYYY (story.test).docx`,
+    or None for files that do not follow it.
+
+    Session 1 files hold two tests of each story, `(story.test)`; session 2
+    files hold the delayed third, named `(story)` or `(Part 2 Story story)`.
+    Tests are numbered across sessions as time_test, as in the recall data.
+    """
+
+    match = _transcript_name.match(os.path.basename(path))
+    if match is None:
+        return None
+
+    subject, session, condition, date, story, test, part_story, single_story = match.groups()
+    session = int(session)
+    if story is None:
+        story, test = part_story or single_story, 1
+    return TranscriptKey(int(subject), session, int(condition), date, int(story),
+                         2 * (session - 1) + int(test))
+
+_word = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+def docx_text(path):
+    """
+    Plain text of a .docx file, one line per paragraph, read straight from
+    its `word/document.xml`.
+    """
+
+    with zipfile.ZipFile(path) as archive:
+        root = ElementTree.fromstring(archive.read('word/document.xml'))
+
+    paragraphs = []
+    for paragraph in root.iter(_word + 'p'):
+        pieces = []
+        for node in paragraph.iter():
+            if node.tag == _word + 't':
+                pieces.append(node.text or '')
+            elif node.tag == _word + 'tab':
+                pieces.append('\t')
+            elif node.tag in (_word + 'br', _word + 'cr'):
+                pieces.append('\n')
+        paragraphs.append(''.join(pieces))
+    return '\n'.join(paragraphs)
+
+def extract_transcripts(root, cache_path=None, max_workers=None):
+    """
+    Extracts the text of every written-recall transcript under `root`
+    (e.g. `data/raw/recall`), parsing files over a process pool.
+
+    Extracted text is cached in `cache_path`, one file per content hash, so
+    reruns only parse new or changed transcripts. Returns one record per
+    .docx file, sorted by path, with its TranscriptKey fields (None for
+    files outside the naming convention), path, hash and text.
+    `max_workers=1` parses in-process.
+    """
+
+    paths = sorted(glob.glob(os.path.join(root, '**', '*.docx'), recursive=True))
+    digests = [file_digest(path) for path in paths]
+    if cache_path is not None:
+        os.makedirs(cache_path, exist_ok=True)
+
+    texts = {}
+    pending = []
+    for path, digest in zip(paths, digests):
+        cached = None if cache_path is None else os.path.join(cache_path, digest + '.txt')
+        if cached is not None and os.path.exists(cached):
+            with open(cached, encoding='utf-8') as f:
+                texts[digest] = f.read()
+        elif digest not in texts:
+            texts[digest] = None
+            pending.append((path, digest))
+
+    def store(extracted):
+        for (path, digest), text in zip(pending, extracted):
+            texts[digest] = text
+            if cache_path is not None:
+                cached = os.path.join(cache_path, digest + '.txt')
+                with open(cached + '.partial', 'w', encoding='utf-8') as f:
+                    f.write(text)
+                os.replace(cached + '.partial', cached)
+
+    if max_workers == 1 or len(pending) < 2:
+        store(map(docx_text, [path for path, _ in pending]))
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            store(pool.map(docx_text, [path for path, _ in pending], chunksize=8))
+
+    records = []
+    for path, digest in zip(paths, digests):
+        key = parse_transcript_name(path)
+        record = dict(zip(TranscriptKey._fields, key or [None] * len(TranscriptKey._fields)))
+        record.update(path=os.path.relpath(path, root), sha256=digest, text=texts[digest])
+        records.append(record)
+    return records
@@ -1,10 +1,50 @@
 # AUTOGENERATED! DO NOT EDIT! File to edit: notebooks/model_variants/Semantic_CMR.ipynb (unless otherwise specified).
 
-__all__ = ['LandscapeRevised', 'cmr_spec', 'Semantic_CMR']
+__all__ = ['packed_rank_one_update', 'packed_symmetric_matvec', 'LandscapeRevised', 'Batched_LandscapeRevised', 'cmr_spec',
+           'one_hot_features', 'Semantic_CMR', 'Compiled_Semantic_CMR', 'Batched_Semantic_CMR', 'simulate_free_recall']
 
 # Cell
 
 import numpy as np
+from numba import njit
+
+@njit(nogil=True)
+def packed_rank_one_update(packed, row_offsets, activations, learning_rate, sigma_argument):
+    """
+    Adds learning_rate * outer(activations, activations) to packed
+    upper-triangular connections and resets the diagonal to 1, writing the
+    argument of sigma's tanh, 3 * (connections - 1), into the same positions
+    of `sigma_argument` in the same pass.
+    """
+
+    unit_count = len(row_offsets) - 1
+    for i in range(unit_count):
+        start = row_offsets[i]
+        packed[start] = 1
+        sigma_argument[start] = 0
+        row_learning = learning_rate * activations[i]
+        for position in range(start + 1, row_offsets[i + 1]):
+            packed[position] += row_learning * activations[i + position - start]
+            sigma_argument[position] = 3 * (packed[position] - 1)
+
+@njit(nogil=True)
+def packed_symmetric_matvec(packed, row_offsets, vector, result):
+    """
+    Writes the product of a packed upper-triangular symmetric matrix and a
+    vector into `result`.
+    """
+
+    unit_count = len(row_offsets) - 1
+    result[:] = 0
+    for i in range(unit_count):
+        start = row_offsets[i]
+        value = vector[i]
+        total = packed[start] * value
+        for position in range(start + 1, row_offsets[i + 1]):
+            j = i + position - start
+            total += packed[position] * vector[j]
+            result[j] += packed[position] * value
+        result[i] += total
 
 class LandscapeRevised:
     """
@@ -28,6 +68,8 @@ class LandscapeRevised:
     - learning_rate: rate of connection weight changes across cycles
     - semantic_strength: relative contribution of initial semantic
         connections to computation of overall connection strengths
+    - connection_dtype: storage precision of connections and sigma;
+        np.float32 halves their memory again for long texts
 
     Retrieval Parameters (imported from CMR, only relevant for free recall):
     - stop_probability_scale
@@ -36,14 +78,22 @@ class LandscapeRevised:
 
     Attributes:
     - activations: vector, current activation of each relevant text unit
-    - connections: array, current connection strengths between text units
+    - connections: array, current connection strengths between text units,
+        unpacked on access from packed_connections into a read-only copy;
+        assign a new matrix to change them
+    - packed_connections: vector, upper triangle of connections packed row
+        by row; connections are symmetric, so this is all that is stored
+    - packed_sigma: vector, spreading weights tanh(3 * (connections - 1)) + 1
+        packed like connections and kept in step with them; together the two
+        triangles hold n^2 values of connection_dtype, the size of a single
+        dense float64 matrix, or half that at np.float32
     """
 
     def __init__(self, connections, stop_probability_scale=1.0,
                  stop_probability_growth=1.0, choice_sensitivity=1.0,
                  max_activity=1.0, min_activity=0.0, decay_rate=0.1,
                  memory_capacity=5.0, learning_rate=0.9,
-                 semantic_strength=1.0):
+                 semantic_strength=1.0, connection_dtype=np.float64):
 
         # store initial parameters
         self.unit_count = len(connections)
@@ -57,19 +107,37 @@ class LandscapeRevised:
         self.learning_rate = learning_rate
         self.semantic_strength = semantic_strength
 
+        # packed position of each row's diagonal entry; row i of the upper
+        # triangle occupies row_offsets[i]:row_offsets[i+1]
+        self.row_offsets = np.zeros(self.unit_count + 1, dtype=np.int64)
+        self.row_offsets[1:] = np.cumsum(np.arange(self.unit_count, 0, -1))
+
         # model architecture is set of activations and connections
         # across units diagonal of connections is 0 since we disallow
         # self-connections
-        self.connections = connections * self.semantic_strength
+        self.connection_dtype = connection_dtype
+        # scaled in place, so the packed store keeps connection_dtype
+        self.packed_connections = self.pack(connections)
+        self.packed_connections *= self.semantic_strength
+        self.packed_sigma = np.empty_like(self.packed_connections)
+        self.update_sigma()
         self.activations = np.zeros(self.unit_count) + self.min_activity
 
-        # other variables to help track encoding/retrieval across trials
+        # other variables to help track encoding/retrieval across trials;
+        # units double as the items scored during recall
+        self.item_count = self.unit_count
         self.recall_total = 0
         self.cycle_index = 0
         self.retrieving = False
-        self.recall = np.zeros(self.unit_count)
+        self.recall = np.zeros(self.unit_count, dtype=np.int32)
+        self.recalled = np.zeros(self.unit_count, dtype=np.bool_)
         self.preretrieval_activations = self.activations
 
+        # spreading and retrieval work in preallocated buffers
+        self.spread_buffer = np.zeros(self.unit_count)
+        self.activation_buffer = np.zeros(self.unit_count)
+        self.probabilities = np.zeros(self.unit_count + 1)
+
     def experience(self, cycles):
         """
         Updates activations and connections based on content of current
@@ -100,6 +168,17 @@ class LandscapeRevised:
             self.update_connections(self.activations)
         self.cycle_index += len(cycles)
 
+    def load_encoding(self, packed_connections, packed_sigma, activations, cycle_index):
+        """
+        Sets the model to a previously recorded post-encoding state.
+        """
+
+        self.packed_connections = packed_connections
+        self.packed_sigma = packed_sigma
+        self.activations = activations
+        self.cycle_index = cycle_index
+        self.retrieving = False
+
     def update_activations(self, cycle):
         """
         Updates unit activations based on current reading cycle.
@@ -112,17 +191,14 @@ class LandscapeRevised:
             memory_capacity.
         """
 
-        # Previous cycle activations decay by a parametrized amount toward
-        # some parametrized minimum value and spread to connected units.
-        sigma = np.tanh(3 * (self.connections - 1)) + 1
-
         # activations of current cycle units set to maximum allowed value
         self.activations[cycle] = self.max_activity
 
-        #previous_activations = self.activations.copy()
-        #for i in range(self.unit_count):
-        #    self.activations[i] = self.decay_rate * np.sum(sigma[i] * previous_activations)
-        self.activations = self.decay_rate * np.sum(sigma * self.activations, axis=1)
+        # Previous cycle activations decay by a parametrized amount toward
+        # some parametrized minimum value and spread to connected units
+        # through the persistent, packed sigma.
+        packed_symmetric_matvec(self.packed_sigma, self.row_offsets, self.activations, self.spread_buffer)
+        self.activations = self.decay_rate * self.spread_buffer
 
         # activations of current cycle units set to maximum allowed value
         self.activations[cycle] = self.max_activity
@@ -149,35 +225,97 @@ class LandscapeRevised:
         smaller than 0, the connection strength necessarily is above 0, and
         changes are incremental.
         """
-        self.connections += self.learning_rate * np.outer(
-            activations, activations)
-        self.connections[np.eye(self.unit_count, dtype='bool')] = 1
+        # every connection changes (spread activations are all positive),
+        # so sigma's tanh is rebuilt in one vectorized pass over the
+        # triangle, from arguments written while updating connections
+        packed_rank_one_update(self.packed_connections, self.row_offsets,
+                               activations, self.learning_rate, self.packed_sigma)
+        np.tanh(self.packed_sigma, self.packed_sigma)
+        self.packed_sigma += 1
+
+    def pack(self, connections):
+        """
+        Packs the upper triangle of a connection matrix row by row.
+
+        Connections are symmetrized first, since similarity matrices are
+        often asymmetric at the level of float32 rounding.
+        """
+
+        packed = np.empty(self.row_offsets[-1], dtype=self.connection_dtype)
+        for i in range(self.unit_count):
+            packed[self.row_offsets[i]:self.row_offsets[i+1]] = (
+                connections[i, i:] + connections[i:, i]) / 2
+        return packed
+
+    @property
+    def connections(self):
+        """
+        Dense, read-only copy of the current connection strengths.
+
+        The copy is unpacked on every access, so writing into it could not
+        change the model; it is marked read-only to make such writes fail.
+        Assign a whole matrix to `connections` instead.
+        """
+
+        connections = np.empty((self.unit_count, self.unit_count), dtype=self.connection_dtype)
+        for i in range(self.unit_count):
+            row = self.packed_connections[self.row_offsets[i]:self.row_offsets[i+1]]
+            connections[i, i:] = row
+            connections[i:, i] = row
+        connections.flags.writeable = False
+        return connections
+
+    @connections.setter
+    def connections(self, connections):
+        self.packed_connections = self.pack(connections)
+        self.update_sigma()
+
+    def update_sigma(self):
+        """
+        Recomputes packed_sigma from packed_connections.
+        """
+
+        np.subtract(self.packed_connections, 1, self.packed_sigma)
+        self.packed_sigma *= 3
+        np.tanh(self.packed_sigma, self.packed_sigma)
+        self.packed_sigma += 1
 
     def outcome_probabilities(self):
         """
         Current unit recall probabilities given model state.
+
+        The result is a buffer that is overwritten by the next call.
         """
 
-        activation = np.power(self.activations, self.choice_sensitivity)
-        probabilities = np.zeros((self.unit_count + 1))
+        activation = self.activation_buffer
+        np.power(self.activations, self.choice_sensitivity, activation)
+        probabilities = self.probabilities
         probabilities[0] = min(self.stop_probability_scale * np.exp(
             self.recall_total * self.stop_probability_growth), 1.0  - (
             (self.unit_count - self.recall_total) * 10e-7))
 
-        for already_recalled_item in self.recall[:self.recall_total]:
-            activation[int(already_recalled_item)] = 0
-        probabilities[1:] = (
-            1-probabilities[0]) * activation / np.sum(activation)
+        # already recalled units have zero activation
+        activation[self.recalled] = 0
+        total = np.sum(activation)
+        activation *= 1-probabilities[0]
+        np.divide(activation, total, probabilities[1:])
 
         return probabilities
 
-    def free_recall(self, steps=None):
+    def free_recall(self, steps=None, rng=None):
+        """
+        Simulates free recall, by default for the rest of the sequence.
+        Outcomes are drawn from `rng`, a numpy Generator, or from the
+        global numpy random state if none is given.
+        """
 
-        # ensure retrieval information is reset
+        # ensure retrieval information is reset; recall sequences already
+        # returned keep their own buffer
         if not self.retrieving:
-            self.recall = np.zeros(self.unit_count)
+            self.recall = np.zeros(self.unit_count, dtype=np.int32)
+            self.recalled[:] = False
             self.recall_total = 0
-            self.preretrieval_activations = self.activations
+            self.preretrieval_activations = self.activations.copy()
             self.retrieving = True
 
         # we retrieve until termination if steps is left unspecified
@@ -193,8 +331,9 @@ class LandscapeRevised:
             # and make choice based on distribution
             outcome_probabilities = self.outcome_probabilities()
             if np.any(outcome_probabilities[1:]):
+                threshold = np.random.rand() if rng is None else rng.random()
                 choice = np.sum(
-                    np.cumsum(outcome_probabilities) < np.random.rand())
+                    np.cumsum(outcome_probabilities) < threshold)
             else:
                 choice = 0
 
@@ -205,6 +344,7 @@ class LandscapeRevised:
                 self.activations = self.preretrieval_activations
                 break
             self.recall[self.recall_total] = choice - 1
+            self.recalled[choice - 1] = True
             self.recall_total += 1
             self.update_activations([choice - 1])
         return self.recall[:self.recall_total]
@@ -213,9 +353,10 @@ class LandscapeRevised:
 
         # ensure retrieval information is reset
         if not self.retrieving:
-            self.recall = np.zeros(self.unit_count)
+            self.recall = np.zeros(self.unit_count, dtype=np.int32)
+            self.recalled[:] = False
             self.recall_total = 0
-            self.preretrieval_activations = self.activations
+            self.preretrieval_activations = self.activations.copy()
             self.retrieving = True
 
         # resolve and maybe store outcome
@@ -224,6 +365,142 @@ class LandscapeRevised:
             pass
         elif choice > 0:
             self.recall[self.recall_total] = choice - 1
+            self.recalled[choice - 1] = True
+            self.recall_total += 1
+            self.update_activations([choice - 1])
+        else:
+            self.retrieving = False
+            self.activations = self.preretrieval_activations
+        return self.recall[:self.recall_total]
+
+# Cell
+
+class Batched_LandscapeRevised:
+    """
+    LandscapeRevised evaluated for a whole population of parameter settings
+    (or simulated readers) at once, with activations, connections and sigma
+    stacked along a leading population axis.
+
+    Each parameter may be a scalar or a vector with one value per population
+    member, and `connections` may be shared or given per member as an
+    (N, n, n) stack. Every member reads the same cycles in lockstep, so a
+    grid over `decay_rate`, `memory_capacity` or `learning_rate` is encoded in
+    one pass. As with Batched_Semantic_CMR, the recall buffer is shared and
+    `outcome_probabilities` is indexed outcome-first, so the likelihood
+    routines apply unchanged.
+    """
+
+    def __init__(self, connections, stop_probability_scale=1.0,
+                 stop_probability_growth=1.0, choice_sensitivity=1.0,
+                 max_activity=1.0, min_activity=0.0, decay_rate=0.1,
+                 memory_capacity=5.0, learning_rate=0.9,
+                 semantic_strength=1.0):
+
+        # every parameter is broadcast to one value per population member
+        parameters = dict(
+            stop_probability_scale=stop_probability_scale, stop_probability_growth=stop_probability_growth,
+            choice_sensitivity=choice_sensitivity, max_activity=max_activity, min_activity=min_activity,
+            decay_rate=decay_rate, memory_capacity=memory_capacity, learning_rate=learning_rate,
+            semantic_strength=semantic_strength)
+        connections = np.asarray(connections, dtype=np.float64)
+        population_size = np.broadcast_shapes(
+            connections.shape[:-2] or (1,),
+            *[np.shape(np.atleast_1d(value)) for value in parameters.values()])[0]
+        for name, value in parameters.items():
+            setattr(self, name, np.broadcast_to(
+                np.asarray(value, dtype=np.float64), (population_size,)).copy())
+
+        # store initial parameters
+        self.unit_count = connections.shape[-1]
+        self.item_count = self.unit_count
+        self.population_size = population_size
+        self.diagonal = np.arange(self.unit_count)
+
+        # connections are symmetrized as in LandscapeRevised
+        connections = (connections + np.swapaxes(connections, -1, -2)) / 2
+        self.connections = np.broadcast_to(
+            connections, (population_size, self.unit_count, self.unit_count)
+            ) * self.semantic_strength[:, None, None]
+        self.sigma = np.tanh(3 * (self.connections - 1)) + 1
+        self.outer_buffer = np.zeros_like(self.connections)
+        self.activations = np.zeros((population_size, self.unit_count)) + self.min_activity[:, None]
+
+        # other variables to help track encoding/retrieval across trials
+        self.recall_total = 0
+        self.cycle_index = 0
+        self.retrieving = False
+        self.recall = np.zeros(self.unit_count, dtype=np.int32)
+        self.recalled = np.zeros(self.unit_count, dtype=np.bool_)
+        self.preretrieval_activations = self.activations
+        self.probabilities = np.zeros((population_size, self.unit_count + 1))
+
+    def experience(self, cycles):
+
+        for cycle in cycles:
+            self.update_activations(cycle)
+            self.update_connections(self.activations)
+        self.cycle_index += len(cycles)
+
+    def update_activations(self, cycle):
+
+        # decay and spread through each member's sigma, with the current
+        # cycle's units held at maximum activity
+        self.activations[:, cycle] = self.max_activity[:, None]
+        self.activations = self.decay_rate[:, None] * np.matmul(
+            self.sigma, self.activations[:, :, None])[:, :, 0]
+        self.activations[:, cycle] = self.max_activity[:, None]
+
+        # activations of all units get set between min and max activity params
+        self.activations = np.maximum(self.activations, self.min_activity[:, None])
+        self.activations = np.minimum(self.activations, self.max_activity[:, None])
+
+        # members over their capacity limit are reduced proportionally to it
+        total_activation = np.sum(self.activations, axis=1)
+        over = total_activation > self.memory_capacity
+        self.activations[over] *= (self.memory_capacity[over] / total_activation[over])[:, None]
+
+    def update_connections(self, activations):
+
+        # rank-1 updates for every member, computed in place
+        np.multiply(activations[:, :, None], activations[:, None, :], self.outer_buffer)
+        self.outer_buffer *= self.learning_rate[:, None, None]
+        self.connections += self.outer_buffer
+        self.connections[:, self.diagonal, self.diagonal] = 1
+
+        np.subtract(self.connections, 1, self.sigma)
+        self.sigma *= 3
+        np.tanh(self.sigma, self.sigma)
+        self.sigma += 1
+
+    def outcome_probabilities(self):
+
+        activation = np.power(self.activations, self.choice_sensitivity[:, None])
+        self.probabilities[:, 0] = np.minimum(self.stop_probability_scale * np.exp(
+            self.recall_total * self.stop_probability_growth), 1.0 - (
+            (self.unit_count - self.recall_total) * 10e-7))
+
+        # already recalled units have zero activation
+        activation[:, self.recalled] = 0
+        total = np.sum(activation, axis=1, keepdims=True)
+        activation *= 1-self.probabilities[:, 0, None]
+        np.divide(activation, total, self.probabilities[:, 1:])
+
+        return self.probabilities.T
+
+    def force_recall(self, choice=None):
+
+        if not self.retrieving:
+            self.recall = np.zeros(self.unit_count, dtype=np.int32)
+            self.recalled[:] = False
+            self.recall_total = 0
+            self.preretrieval_activations = self.activations.copy()
+            self.retrieving = True
+
+        if choice is None:
+            pass
+        elif choice > 0:
+            self.recall[self.recall_total] = choice - 1
+            self.recalled[choice - 1] = True
             self.recall_total += 1
             self.update_activations([choice - 1])
         else:
@@ -233,7 +510,7 @@ class LandscapeRevised:
 
 # Cell
 import numpy as np
-from numba import float64, int32, boolean
+from numba import float64, int32, boolean, njit
 from numba.experimental import jitclass
 
 cmr_spec = [
@@ -257,17 +534,38 @@ cmr_spec = [
     ('recall_total', int32),
     ('primacy_weighting', float64[::1]),
     ('probabilities', float64[::1]),
+    ('activation_buffer', float64[::1]),
+    ('context_input', float64[::1]),
+    ('drift_buffer', float64[::1]),
+    ('rho_buffer', float64[::1]),
     ('mfc', float64[:,::1]),
     ('mcf', float64[:,::1]),
     ('encoding_index', int32),
-    ('items', float64[:,::1]),
+    ('_items', float64[:,::1]),
+    ('item_features', int32[::1]),
     ('semantic_scale', float64),
-    ('similarities', float64[:,::1])
+    ('similarities', float64[:,::1]),
+    ('retrieval_matrix', float64[:,::1]),
+    ('retrieval_scale', float64),
+    ('retrieval_stale', boolean)
 ]
 
+@njit
+def one_hot_features(items):
+    """
+    The single feature of each item represented by a unit vector, or -1 for
+    distributed representations, which need the dense Mfc product.
+    """
+
+    features = np.full(len(items), -1, dtype=np.int32)
+    for i in range(len(items)):
+        nonzero = np.nonzero(items[i])[0]
+        if len(nonzero) == 1 and items[i, nonzero[0]] == 1.0:
+            features[i] = nonzero[0]
+    return features
+
 # Cell
 
-#@jitclass(cmr_spec)
 class Semantic_CMR:
 
     def __init__(self, presentation_count, similarities, parameters):
@@ -296,7 +594,7 @@ class Semantic_CMR:
         # associated with the set of items
         self.context = np.zeros(item_count + 2)
         self.context[0] = 1
-        self.preretrieval_context = self.context
+        self.preretrieval_context = self.context.copy()
         self.recall = np.zeros(item_count, dtype=np.int32) # recalls has at most `item_count` entries
         self.retrieving = False
         self.recall_total = 0
@@ -305,8 +603,13 @@ class Semantic_CMR:
         self.primacy_weighting = parameters['primacy_scale'] * np.exp(
             -parameters['primacy_decay'] * np.arange(presentation_count)) + 1
 
-        # preallocate for outcome_probabilities
+        # preallocate for outcome_probabilities and context updates so the
+        # recall loop works in place without allocating
         self.probabilities = np.zeros((item_count + 1))
+        self.activation_buffer = np.zeros(item_count)
+        self.context_input = np.zeros(item_count + 2)
+        self.drift_buffer = np.zeros(item_count + 2)
+        self.rho_buffer = np.zeros(item_count + 2)
 
         # predefine contextual input vectors relevant for delay_drift_rate and start_drift_rate parameters
         self.start_context_input = np.zeros((self.item_count+2))
@@ -322,10 +625,37 @@ class Semantic_CMR:
             self.mcf[i, i] = self.item_support
         self.mcf =  np.vstack((np.zeros((1, item_count)), self.mcf, np.zeros((1, item_count))))
         self.encoding_index = 0
+
+        # retrieval cues Mcf and scaled semantic similarities together
+        # through one fused matrix, rebuilt lazily whenever Mcf or
+        # semantic_scale has changed since it was last built
+        self.retrieval_matrix = np.zeros((item_count + 2, item_count))
+        self.retrieval_scale = self.semantic_scale
+        self.retrieval_stale = True
         self.items = np.eye(item_count, item_count)
 
     def experience(self, experiences):
 
+        # features of distinct one-hot items never overlap, so no item's
+        # context input depends on what earlier items in this call taught
+        # Mfc; the context trajectory is then recorded first and both
+        # matrices learn it with a single matrix product each
+        if self.distinct_one_hot(experiences):
+            presentation_count = len(experiences)
+            contexts = np.zeros((presentation_count, self.item_count + 2))
+            for i in range(presentation_count):
+                self.update_context(self.encoding_drift_rate, experiences[i])
+                contexts[i] = self.context
+
+            weighting = self.primacy_weighting[
+                self.encoding_index:self.encoding_index + presentation_count]
+            self.mfc += self.learning_rate * np.dot(experiences.T, contexts)
+            self.mcf += np.dot(contexts.T, experiences * weighting.reshape((-1, 1)))
+            self.encoding_index += presentation_count
+            self.retrieval_stale = True
+            return
+
+        # distributed or repeated features need sequential rank-1 updates
         for i in range(len(experiences)):
             self.update_context(self.encoding_drift_rate, experiences[i])
             self.mfc += self.learning_rate * np.outer(
@@ -333,6 +663,27 @@ class Semantic_CMR:
             self.mcf += self.primacy_weighting[self.encoding_index] * np.outer(
                 self.context, experiences[i])
             self.encoding_index += 1
+        self.retrieval_stale = True
+
+    def load_encoding(self, mfc, mcf, context, encoding_index):
+
+        # adopt a post-encoding state computed elsewhere (e.g. a cache)
+        self.mfc = mfc
+        self.mcf = mcf
+        self.context = context
+        self.encoding_index = encoding_index
+        self.retrieval_stale = True
+
+    def distinct_one_hot(self, experiences):
+
+        # each experience has a single nonzero feature, none shared
+        seen = np.zeros(self.item_count, dtype=np.bool_)
+        for i in range(len(experiences)):
+            features = np.nonzero(experiences[i])[0]
+            if len(features) != 1 or seen[features[0]]:
+                return False
+            seen[features[0]] = True
+        return True
 
     def update_context(self, drift_rate, experience):
 
@@ -340,27 +691,78 @@ class Semantic_CMR:
         if len(experience) == len(self.mfc):
 
             # if the context is not pre-experimental, the context is retrieved
-            context_input = np.dot(experience, self.mfc)
-            context_input = context_input / np.sqrt(
-                np.sum(np.square(context_input))) # norm to length 1
+            np.dot(experience, self.mfc, self.context_input)
+            self.normalize_context_input(self.context_input)
+            self.drift_context(drift_rate, self.context_input)
         else:
-            context_input = experience
+            self.drift_context(drift_rate, experience)
+
+    def update_context_with_item(self, drift_rate, item_index):
+
+        # a one-hot item cue retrieves its row of Mfc without a dense product
+        feature = self.item_features[item_index]
+        if feature >= 0:
+            self.normalize_context_input(self.mfc[feature])
+            self.drift_context(drift_rate, self.context_input)
+        else:
+            self.update_context(drift_rate, self.items[item_index])
+
+    @property
+    def items(self):
+        return self._items
+
+    @items.setter
+    def items(self, items):
+
+        # each item's one-hot feature is found once, when items are set, so
+        # recall steps look it up without allocating
+        self._items = items
+        self.item_features = one_hot_features(items)
+
+    def normalize_context_input(self, retrieved):
+
+        # norm to length 1, written into the context_input buffer
+        np.square(retrieved, self.drift_buffer)
+        np.divide(retrieved, np.sqrt(np.sum(self.drift_buffer)), self.context_input)
+
+    def drift_context(self, drift_rate, context_input):
 
         # updated context is sum of context and input, modulated by rho to have len 1 and some drift_rate
-        rho = np.sqrt(1 + np.square(min(drift_rate, 1.0)) * (
-            np.square(self.context * context_input) - 1)) - (
-                min(drift_rate, 1.0) * (self.context * context_input))
-        self.context = (rho * self.context) + (min(drift_rate, 1.0) * context_input)
+        # rho = sqrt(1 + drift^2 * ((context * input)^2 - 1)) - drift * (context * input)
+        drift_rate = min(drift_rate, 1.0)
+        overlap = self.drift_buffer
+        rho = self.rho_buffer
+        np.multiply(self.context, context_input, overlap)
+        np.square(overlap, rho)
+        rho -= 1
+        rho *= np.square(drift_rate)
+        rho += 1
+        np.sqrt(rho, rho)
+        overlap *= drift_rate
+        rho -= overlap
+
+        # context is updated in place to rho * context + drift_rate * input
+        self.context *= rho
+        np.multiply(context_input, drift_rate, overlap)
+        self.context += overlap
 
     def activations(self, probe, use_mfc=False):
 
         if use_mfc:
             return np.dot(probe, self.mfc) + 10e-7
-        elif self.semantic_scale == 0.0:
-            return np.dot(probe, self.mcf) + 10e-7
-        else:
-            return (self.semantic_scale * np.dot(probe, self.similarities)
-                   ) + np.dot(probe, self.mcf) + 10e-7
+
+        # semantic and episodic support come from a single product
+        if self.retrieval_stale or self.retrieval_scale != self.semantic_scale:
+            self.refresh_retrieval_matrix()
+        return np.dot(probe, self.retrieval_matrix) + 10e-7
+
+    def refresh_retrieval_matrix(self):
+
+        self.retrieval_matrix[:, :] = self.mcf
+        if self.semantic_scale != 0.0:
+            self.retrieval_matrix += self.semantic_scale * self.similarities
+        self.retrieval_scale = self.semantic_scale
+        self.retrieval_stale = False
 
     def outcome_probabilities(self):
 
@@ -372,7 +774,11 @@ class Semantic_CMR:
         if self.probabilities[0] < (1.0 - ((self.item_count-self.recall_total) * 10e-7)):
 
             # measure the activation for each item
-            activation = self.activations(self.context)
+            if self.retrieval_stale or self.retrieval_scale != self.semantic_scale:
+                self.refresh_retrieval_matrix()
+            activation = self.activation_buffer
+            np.dot(self.context, self.retrieval_matrix, activation)
+            activation += 10e-7
 
             # already recalled items have zero activation
             activation[self.recall[:self.recall_total]] = 0
@@ -380,21 +786,24 @@ class Semantic_CMR:
             if np.sum(activation) > 0:
 
                 # power sampling rule vs modified exponential sampling rule
-                activation = np.power(activation, self.choice_sensitivity)
+                np.power(activation, self.choice_sensitivity, activation)
 
                 # normalized result downweighted by stop prob is probability of choosing each item
-                self.probabilities[1:] = (
-                    1-self.probabilities[0]) * activation / np.sum(activation)
+                total = np.sum(activation)
+                activation *= 1-self.probabilities[0]
+                np.divide(activation, total, self.probabilities[1:])
 
         return self.probabilities
 
-    def free_recall(self, steps=None):
+    def free_recall(self, steps=None, rng=None):
 
+        # outcomes are drawn from rng (a numpy Generator) when given,
+        # otherwise from the global numpy random state
         # some amount of the pre-list context is reinstated before initiating recall
         if not self.retrieving:
             self.recall = np.zeros(self.item_count, dtype=np.int32)
             self.recall_total = 0
-            self.preretrieval_context = self.context
+            self.preretrieval_context[:] = self.context
             self.update_context(self.start_drift_rate, self.start_context_input)
             self.retrieving = True
 
@@ -410,7 +819,10 @@ class Semantic_CMR:
             # compute outcome probabilities and make choice based on distribution
             outcome_probabilities = self.outcome_probabilities()
             if np.any(outcome_probabilities[1:]):
-                choice = np.sum(np.cumsum(outcome_probabilities) < np.random.rand(), dtype=np.int32)
+                if rng is None:
+                    choice = self.sample_outcome(np.random.rand())
+                else:
+                    choice = self.sample_outcome(rng.random())
             else:
                 choice = 0
 
@@ -418,14 +830,212 @@ class Semantic_CMR:
             # we stop recall if no choice is made (0)
             if choice == 0:
                 self.retrieving = False
-                self.context = self.preretrieval_context
+                self.context[:] = self.preretrieval_context
                 break
 
             self.recall[self.recall_total] = choice - 1
             self.recall_total += 1
-            self.update_context(self.recall_drift_rate, self.items[choice - 1])
+            self.update_context_with_item(self.recall_drift_rate, choice - 1)
         return self.recall[:self.recall_total]
 
+    def sample_outcome(self, threshold):
+
+        # inverse-CDF draw: count outcomes whose running cumulative
+        # probability stays below threshold, without a cumsum array
+        choice = 0
+        cumulative = 0.0
+        for outcome in range(len(self.probabilities)):
+            cumulative += self.probabilities[outcome]
+            if cumulative >= threshold:
+                break
+            choice += 1
+        return choice
+
+    def force_recall(self, choice=None):
+
+        if not self.retrieving:
+            self.recall = np.zeros(self.item_count, dtype=np.int32)
+            self.recall_total = 0
+            self.preretrieval_context[:] = self.context
+            self.update_context(self.start_drift_rate, self.start_context_input)
+            self.retrieving = True
+
+        if choice is None:
+            pass
+        elif choice > 0:
+            self.recall[self.recall_total] = choice - 1
+            self.recall_total += 1
+            self.update_context_with_item(self.recall_drift_rate, choice - 1)
+        else:
+            self.retrieving = False
+            self.context[:] = self.preretrieval_context
+        return self.recall[:self.recall_total]
+
+# Cell
+
+# numba-compiled variant of Semantic_CMR sharing its implementation;
+# constructor expects a numba typed Dict of float64 parameters
+Compiled_Semantic_CMR = jitclass(cmr_spec)(Semantic_CMR)
+
+# Cell
+
+class Batched_Semantic_CMR:
+    """
+    Semantic_CMR evaluated for a whole population of parameter settings at
+    once, with model state stacked along a leading population axis.
+
+    Each entry of `parameters` may be a scalar or a vector with one value per
+    population member. Because every member replays the same recall events,
+    the recall buffer is shared; only context, associative matrices and
+    probabilities carry the population axis. `outcome_probabilities` is
+    indexed outcome-first, so `outcome_probabilities()[choice]` is the vector
+    of probabilities of that outcome across the population and the
+    likelihood routines written against Semantic_CMR apply unchanged.
+    """
+
+    def __init__(self, presentation_count, similarities, parameters):
+
+        # every parameter is broadcast to one value per population member
+        names = ['encoding_drift_rate', 'start_drift_rate', 'recall_drift_rate',
+                 'shared_support', 'item_support', 'learning_rate',
+                 'primacy_scale', 'primacy_decay', 'stop_probability_scale',
+                 'stop_probability_growth', 'choice_sensitivity', 'semantic_scale']
+        values = np.broadcast_arrays(*[
+            np.atleast_1d(np.asarray(parameters[name], dtype=np.float64)) for name in names])
+        for name, value in zip(names, values):
+            setattr(self, name, value.copy())
+
+        # store initial parameters
+        item_count = len(similarities)
+        population_size = len(values[0])
+        self.item_count = item_count
+        self.population_size = population_size
+
+        # specialized support for semantic connections when MCF is the cue
+        self.similarities = np.vstack((np.zeros((1, item_count)), similarities, np.zeros((1, item_count))))
+
+        # context starts orthogonal to the pre-experimental context
+        self.context = np.zeros((population_size, item_count + 2))
+        self.context[:, 0] = 1
+        self.preretrieval_context = self.context
+        self.recall = np.zeros(item_count, dtype=np.int32)
+        self.retrieving = False
+        self.recall_total = 0
+
+        # predefine primacy weighting vectors
+        self.primacy_weighting = self.primacy_scale[:, None] * np.exp(
+            -self.primacy_decay[:, None] * np.arange(presentation_count)) + 1
+
+        # preallocate for outcome_probabilities
+        self.probabilities = np.zeros((population_size, item_count + 1))
+
+        # predefine contextual input vectors relevant for start_drift_rate
+        self.start_context_input = np.zeros((self.item_count+2))
+        self.start_context_input[0] = 1
+
+        # pre-experimental Mfc and Mcf, stacked across the population
+        self.mfc = np.eye(item_count, item_count+2, 1)[None] * (1-self.learning_rate[:, None, None])
+        mcf = np.ones((population_size, item_count, item_count)) * self.shared_support[:, None, None]
+        mcf[:, np.arange(item_count), np.arange(item_count)] = self.item_support[:, None]
+        self.mcf = np.concatenate((
+            np.zeros((population_size, 1, item_count)), mcf,
+            np.zeros((population_size, 1, item_count))), axis=1)
+        self.encoding_index = 0
+        self.items = np.eye(item_count, item_count)
+
+        # fused Mcf plus scaled similarities, rebuilt after encoding
+        self.retrieval_matrix = None
+        self.retrieval_stale = True
+
+    def experience(self, experiences):
+
+        for i in range(len(experiences)):
+            self.update_context(self.encoding_drift_rate, experiences[i])
+            self.mfc += self.learning_rate[:, None, None] * (
+                experiences[i][None, :, None] * self.context[:, None, :])
+            self.mcf += self.primacy_weighting[:, self.encoding_index, None, None] * (
+                self.context[:, :, None] * experiences[i][None, None, :])
+            self.encoding_index += 1
+        self.retrieval_stale = True
+
+    def update_context(self, drift_rate, experience):
+
+        # item features retrieve each member's context through its Mfc
+        if len(experience) == self.mfc.shape[1]:
+            context_input = np.matmul(experience, self.mfc)
+            context_input = context_input / np.sqrt(
+                np.sum(np.square(context_input), axis=1, keepdims=True)) # norm to length 1
+        else:
+            context_input = np.broadcast_to(experience, self.context.shape)
+
+        self.drift_context(drift_rate, context_input)
+
+    def update_context_with_item(self, drift_rate, item_index):
+
+        # a one-hot item cue retrieves each member's row of Mfc directly
+        feature = self.item_features[item_index]
+        if feature >= 0:
+            context_input = self.mfc[:, feature]
+            context_input = context_input / np.sqrt(
+                np.sum(np.square(context_input), axis=1, keepdims=True)) # norm to length 1
+            self.drift_context(drift_rate, context_input)
+        else:
+            self.update_context(drift_rate, self.items[item_index])
+
+    @property
+    def items(self):
+        return self._items
+
+    @items.setter
+    def items(self, items):
+        self._items = items
+        self.item_features = one_hot_features(items)
+
+    def drift_context(self, drift_rate, context_input):
+
+        # updated context is sum of context and input, modulated by rho to have len 1 and some drift_rate
+        drift_rate = np.minimum(drift_rate, 1.0)[:, None]
+        rho = np.sqrt(1 + np.square(drift_rate) * (
+            np.square(self.context * context_input) - 1)) - (
+                drift_rate * (self.context * context_input))
+        self.context = (rho * self.context) + (drift_rate * context_input)
+
+    def activations(self, probe, use_mfc=False):
+
+        probe = probe[:, None, :]
+        if use_mfc:
+            return np.matmul(probe, self.mfc)[:, 0] + 10e-7
+
+        # semantic and episodic support come from a single product
+        if self.retrieval_stale:
+            self.retrieval_matrix = self.mcf + (
+                self.semantic_scale[:, None, None] * self.similarities)
+            self.retrieval_stale = False
+        return np.matmul(probe, self.retrieval_matrix)[:, 0] + 10e-7
+
+    def outcome_probabilities(self):
+
+        stop_limit = 1.0 - ((self.item_count-self.recall_total) * 10e-7)
+        self.probabilities[:, 0] = np.minimum(self.stop_probability_scale * np.exp(
+            self.recall_total * self.stop_probability_growth), stop_limit)
+        self.probabilities[:, 1:] = 10e-7
+
+        # measure the activation for each item; recalled items get zero
+        activation = self.activations(self.context)
+        activation[:, self.recall[:self.recall_total]] = 0
+
+        # only members whose stop probability leaves room to recall
+        active = (self.probabilities[:, 0] < stop_limit) & (np.sum(activation, axis=1) > 0)
+        if np.any(active):
+
+            # power sampling rule, normalized and downweighted by stop prob
+            activation = np.power(activation[active], self.choice_sensitivity[active, None])
+            self.probabilities[active, 1:] = (
+                1-self.probabilities[active, 0, None]) * activation / np.sum(
+                    activation, axis=1, keepdims=True)
+
+        return self.probabilities.T
+
     def force_recall(self, choice=None):
 
         if not self.retrieving:
@@ -440,8 +1050,98 @@ class Semantic_CMR:
         elif choice > 0:
             self.recall[self.recall_total] = choice - 1
             self.recall_total += 1
-            self.update_context(self.recall_drift_rate, self.items[choice - 1])
+            self.update_context_with_item(self.recall_drift_rate, choice - 1)
         else:
             self.retrieving = False
             self.context = self.preretrieval_context
-        return self.recall[:self.recall_total]
\ No newline at end of file
+        return self.recall[:self.recall_total]
+
+# Cell
+
+def simulate_free_recall(model, simulation_count, rng=None):
+    """
+    Simulates many free recall sequences from one encoded Semantic_CMR in
+    lockstep.
+
+    Every simulation starts from the model's post-encoding state. At each
+    output position the contexts of all still-recalling simulations are
+    cued together, outcomes are drawn by vectorized inverse-CDF sampling,
+    and simulations that stop are masked out of later steps. The model
+    itself is left unchanged.
+
+    Returns a (simulation_count, item_count) array of recalled study
+    positions counted from 1 and padded with 0, the same layout as the
+    trial arrays scored by the likelihood functions. Outcomes are drawn
+    from `rng` (a Generator, seed or SeedSequence accepted by
+    `np.random.default_rng`) or from the global numpy random state if
+    it is None.
+    """
+
+    if rng is None:
+        uniform = np.random.rand
+    else:
+        uniform = np.random.default_rng(rng).random
+
+    item_count = model.item_count
+    context = model.preretrieval_context if model.retrieving else model.context
+    model.refresh_retrieval_matrix()
+    retrieval_matrix = model.retrieval_matrix
+
+    # recall cues look up rows of Mfc only if every item is a unit vector
+    features = model.item_features
+    if np.any(features < 0):
+        features = None
+
+    def drift(contexts, drift_rate, context_input):
+        drift_rate = min(drift_rate, 1.0)
+        overlap = contexts * context_input
+        rho = np.sqrt(1 + np.square(drift_rate) * (np.square(overlap) - 1)) - (
+            drift_rate * overlap)
+        return (rho * contexts) + (drift_rate * context_input)
+
+    # some amount of the pre-list context is reinstated before recall
+    contexts = drift(np.tile(context, (simulation_count, 1)),
+                     model.start_drift_rate, model.start_context_input)
+    recalled = np.zeros((simulation_count, item_count), dtype=bool)
+    recalls = np.zeros((simulation_count, item_count), dtype=np.int64)
+    active = np.arange(simulation_count)
+
+    for recall_total in range(item_count):
+
+        # stop probability depends only on output position
+        stop_limit = 1.0 - ((item_count - recall_total) * 10e-7)
+        probabilities = np.full((len(active), item_count + 1), 10e-7)
+        probabilities[:, 0] = min(model.stop_probability_scale * np.exp(
+            recall_total * model.stop_probability_growth), stop_limit)
+
+        if probabilities[0, 0] < stop_limit:
+            activation = np.dot(contexts, retrieval_matrix) + 10e-7
+            activation[recalled[active]] = 0
+            total = np.sum(activation, axis=1)
+            cued = total > 0
+            activation = np.power(activation[cued], model.choice_sensitivity)
+            probabilities[cued, 1:] = (1 - probabilities[cued, 0, None]) * (
+                activation / np.sum(activation, axis=1, keepdims=True))
+
+        # inverse-CDF sampling of each simulation's outcome
+        thresholds = uniform(len(active))
+        choices = np.sum(np.cumsum(probabilities, axis=1) < thresholds[:, None], axis=1)
+
+        # simulations choosing 0 stop recalling
+        continuing = choices > 0
+        active, contexts, choices = active[continuing], contexts[continuing], choices[continuing]
+        if len(active) == 0:
+            break
+        recalls[active, recall_total] = choices
+        recalled[active, choices - 1] = True
+
+        # each recalled item retrieves its context input through Mfc
+        if features is not None:
+            context_input = model.mfc[features[choices - 1]]
+        else:
+            context_input = np.dot(model.items[choices - 1], model.mfc)
+        context_input = context_input / np.sqrt(
+            np.sum(np.square(context_input), axis=1, keepdims=True))
+        contexts = drift(contexts, model.recall_drift_rate, context_input)
+
+    return recalls
@@ -0,0 +1,56 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: notebooks/model_evaluation/Simulation.ipynb (unless otherwise specified).
+
+__all__ = ['subject_rng', 'simulate_subjects']
+
+# Cell
+
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+def subject_rng(seed, subject_index):
+    """
+    Independent random stream for one simulated subject.
+
+    Streams are the children of `np.random.SeedSequence(seed)`, identified
+    by subject index, so any single subject of a run can be replayed
+    without regenerating the others. A SeedSequence seed, such as one of
+    several spawned per run, keeps its own spawn key, so subjects of runs
+    under sibling seeds draw independent streams.
+    """
+
+    if isinstance(seed, np.random.SeedSequence):
+        return np.random.default_rng(np.random.SeedSequence(
+            seed.entropy, spawn_key=tuple(seed.spawn_key) + (subject_index,), pool_size=seed.pool_size))
+    return np.random.default_rng(
+        np.random.SeedSequence(seed, spawn_key=(subject_index,)))
+
+def _simulate_subject(simulate, seed, subject_index):
+    return simulate(subject_index, subject_rng(seed, subject_index))
+
+def simulate_subjects(simulate, subject_count, seed=None, max_workers=None):
+    """
+    Runs `simulate(subject_index, rng)` for every subject, fanned out over a
+    process pool, and returns the results in subject order.
+
+    Each subject draws from its own child stream of `seed` (see
+    `subject_rng`), so a run is reproducible and its subjects statistically
+    independent however subjects are spread across workers. `seed` may be an
+    int or a whole SeedSequence (e.g. one spawned per run); when it is None
+    fresh entropy is drawn. Pass the returned root seed back in to replay
+    the run. `simulate` must be picklable (e.g. defined at module
+    level) unless `max_workers=1`, which runs in-process.
+
+    Returns (results, seed).
+    """
+
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+
+    if max_workers == 1:
+        return [_simulate_subject(simulate, seed, i) for i in range(subject_count)], seed
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        results = list(pool.map(
+            _simulate_subject, [simulate] * subject_count, [seed] * subject_count,
+            range(subject_count)))
+    return results, seed
@@ -0,0 +1,52 @@
+import os
+
+import numpy as np
+import pytest
+from numba.typed import List
+
+from narrative_cmr.datasets import open_trial_store, open_similarity_store
+
+@pytest.fixture
+def parameters():
+    return {'encoding_drift_rate': .5, 'start_drift_rate': .3, 'recall_drift_rate': .6,
+            'shared_support': .05, 'item_support': .3, 'learning_rate': .4,
+            'primacy_scale': 2., 'primacy_decay': .5, 'stop_probability_scale': .01,
+            'stop_probability_growth': .2, 'choice_sensitivity': 2., 'semantic_scale': .5}
+
+@pytest.fixture
+def small_stories():
+    """
+    Zero-padded trials and connections of two small stories, with trials
+    sharing recall prefixes, an empty trial and one recalling every unit.
+    """
+
+    rng = np.random.default_rng(0)
+    connections = List()
+    for size in (5, 7):
+        similarities = rng.random((size, size))
+        connections.append((similarities + similarities.T) / 2 + 1)
+
+    data_to_fit = List([
+        np.array([[1, 2, 3, 4, 5], [1, 2, 3, 4, 5], [2, 1, 0, 0, 0], [0, 0, 0, 0, 0], [1, 2, 4, 0, 0]]),
+        np.array([[3, 1, 2, 0], [3, 1, 7, 6], [3, 1, 2, 0], [5, 0, 0, 0]])])
+    return data_to_fit, connections
+
+@pytest.fixture(scope='module')
+def real_stories(tmp_path_factory):
+    """
+    First-session trials and connections of the six stories in `data`, read
+    through stores built in a temporary directory. Similarities are cosines,
+    shifted by 1 to keep activations positive.
+    """
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    store_path = tmp_path_factory.mktemp('stores')
+    trial_store = open_trial_store(os.path.join(root, 'data', 'psifr_sbs.csv'),
+                                   str(store_path / 'trials'))
+    similarity_store = open_similarity_store(os.path.join(root, 'data', 'similarities.json'),
+                                             str(store_path / 'similarities'))
+
+    connections = List()
+    for matrix in similarity_store.connections(trial_store.story_names):
+        connections.append(np.asarray(matrix) + 1)
+    return trial_store.data_to_fit(1), connections
@@ -0,0 +1,25 @@
+import numpy as np
+
+from narrative_cmr.models import Semantic_CMR
+from narrative_cmr.evaluation import semantic_data_likelihood
+from narrative_cmr.gradients import semantic_likelihood_gradient, finite_difference_gradient
+
+free_parameters = ['encoding_drift_rate', 'recall_drift_rate', 'learning_rate', 'primacy_scale',
+                   'choice_sensitivity', 'semantic_scale', 'stop_probability_growth']
+
+def test_gradient_value_matches_semantic_data_likelihood(small_stories, parameters):
+    data_to_fit, connections = small_stories
+    result, _ = semantic_likelihood_gradient(data_to_fit, connections, parameters, free_parameters)
+    expected = semantic_data_likelihood(data_to_fit, connections, Semantic_CMR, parameters)
+    assert np.isclose(result, expected, rtol=1e-12)
+
+def test_gradient_matches_finite_differences(small_stories, parameters):
+    data_to_fit, connections = small_stories
+
+    def likelihood(x):
+        varied = dict(parameters, **dict(zip(free_parameters, x)))
+        return semantic_data_likelihood(data_to_fit, connections, Semantic_CMR, varied)
+
+    x = np.array([parameters[name] for name in free_parameters])
+    _, gradient = semantic_likelihood_gradient(data_to_fit, connections, parameters, free_parameters)
+    assert np.allclose(gradient, finite_difference_gradient(likelihood, x), rtol=1e-5, atol=1e-5)
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+from numba.typed import Dict
+from numba.core import types
+
+from narrative_cmr.models import Semantic_CMR, Compiled_Semantic_CMR
+from narrative_cmr.datasets import ragged_trials, recall_tries
+from narrative_cmr.evaluation import semantic_data_likelihood
+
+@pytest.mark.parametrize('stories', ['small_stories', 'real_stories'])
+def test_trial_packings_give_equal_likelihoods(stories, parameters, request):
+    data_to_fit, connections = request.getfixturevalue(stories)
+
+    padded = semantic_data_likelihood(data_to_fit, connections, Semantic_CMR, parameters)
+    ragged = semantic_data_likelihood(ragged_trials(data_to_fit), connections, Semantic_CMR, parameters)
+    trie = semantic_data_likelihood(recall_tries(data_to_fit), connections, Semantic_CMR, parameters)
+    assert np.isclose(ragged, padded, rtol=1e-12)
+    assert np.isclose(trie, padded, rtol=1e-12)
+
+@pytest.mark.parametrize('packing', [None, ragged_trials, recall_tries])
+@pytest.mark.parametrize('stories', ['small_stories', 'real_stories'])
+def test_compiled_model_matches_python_model(stories, packing, parameters, request):
+    data_to_fit, connections = request.getfixturevalue(stories)
+    if packing is not None:
+        data_to_fit = packing(data_to_fit)
+
+    typed_parameters = Dict.empty(key_type=types.unicode_type, value_type=types.float64)
+    for name, value in parameters.items():
+        typed_parameters[name] = value
+
+    expected = semantic_data_likelihood(data_to_fit, connections, Semantic_CMR, parameters)
+    compiled = semantic_data_likelihood(data_to_fit, connections, Compiled_Semantic_CMR, typed_parameters)
+    assert np.isclose(compiled, expected, rtol=1e-12)
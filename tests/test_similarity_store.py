@@ -0,0 +1,41 @@
+import os
+import sys
+import json
+import subprocess
+
+import numpy as np
+
+from narrative_cmr.datasets import SimilarityStore
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# attaches to the shared block, prints a checksum of one story and exits
+attaching_worker = """
+import sys, json
+from narrative_cmr.datasets import SimilarityStore
+store = SimilarityStore.attach(json.loads(sys.argv[1]))
+print(float(store['second'].sum()))
+store.close()
+"""
+
+def test_attaching_processes_leave_shared_block_to_owner():
+    rng = np.random.default_rng(0)
+    matrices = [rng.random((3, 3)), rng.random((4, 4))]
+    buffer = np.concatenate([matrix.ravel() for matrix in matrices])
+    descriptor, shared = SimilarityStore(buffer, ['first', 'second'], [3, 4]).share()
+
+    try:
+        # each worker is an independent process that exits before the next
+        # attaches; none of them may take the block down with it
+        for _ in range(4):
+            completed = subprocess.run([sys.executable, '-c', attaching_worker, json.dumps(descriptor)],
+                                       cwd=root, capture_output=True, text=True)
+            assert completed.returncode == 0, completed.stderr
+            assert float(completed.stdout) == matrices[1].sum()
+
+        attached = SimilarityStore.attach(descriptor)
+        assert np.array_equal(attached['first'], matrices[0])
+        attached.close()
+    finally:
+        shared.close()
+        shared.unlink()